@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_AGENTS = 8
+
+
+def dataframe_fingerprint(df):
+    """
+    Computes a content fingerprint of a DataFrame.
+
+    Parameters:
+    df (pd.DataFrame): The dataset.
+
+    Returns:
+    str: Hex digest that changes whenever values, columns or dtypes change.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(zip(df.columns, map(str, df.dtypes)))).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def llm_config_key(llm):
+    """Describes the LLM settings that change how an agent answers."""
+    fields = ("model_name", "model", "temperature", "max_tokens", "top_p")
+    settings = [(field, getattr(llm, field, None)) for field in fields]
+    return f"{type(llm).__name__}:{settings}"
+
+
+class AgentRegistry:
+    """
+    Keeps built pandas agents alive across Streamlit reruns.
+
+    Agents are keyed on the dataset fingerprint and the LLM configuration, so
+    a rerun on the same data reuses the prompt and tool wiring instead of
+    building them again. At most max_agents are kept, least recently used
+    first out.
+    """
+
+    def __init__(self, build_agent, max_agents=DEFAULT_MAX_AGENTS):
+        self.build_agent = build_agent
+        self.max_agents = max_agents
+        self._agents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, llm, df, fingerprint=None, **agent_kwargs):
+        """
+        Returns the agent for (df, llm), building it on first use.
+
+        Parameters:
+        llm: The language model the agent runs on.
+        df (pd.DataFrame): The dataset the agent queries.
+        fingerprint (str): Precomputed content key of df, if the caller has one.
+        agent_kwargs: Extra options passed to build_agent.
+
+        Returns:
+        The agent built by build_agent(llm, df, **agent_kwargs).
+        """
+        if fingerprint is None:
+            fingerprint = dataframe_fingerprint(df)
+        key = (fingerprint, llm_config_key(llm), repr(sorted(agent_kwargs.items())))
+        with self._lock:
+            if key in self._agents:
+                self._agents.move_to_end(key)
+                return self._agents[key]
+            # The agent runs generated code that may modify its frame in place, so it gets its own copy
+            agent = self.build_agent(llm, df.copy(), **agent_kwargs)
+            self._agents[key] = agent
+            while len(self._agents) > self.max_agents:
+                self._agents.popitem(last=False)
+            return agent
+
+    def invalidate(self, fingerprint=None):
+        """Drops the agents built for fingerprint, or every agent if it is None."""
+        with self._lock:
+            if fingerprint is None:
+                self._agents.clear()
+                return
+            for key in [key for key in self._agents if key[0] == fingerprint]:
+                del self._agents[key]
@@ -0,0 +1,242 @@
+"""
+Headless batch mode: runs a fixed list of queries over a CSV and writes the
+PDF report plus a JSON manifest of the results, without Streamlit.
+
+Run from the repository root:
+
+    python -m batch data.csv queries.txt --report report.pdf --manifest results.json
+    python -m batch data.csv queries.txt --workers 4 --per-minute 20
+
+The query file holds one query per line (blank lines and lines starting with
+# are skipped), or a JSON list of strings when it ends in .json. Queries run
+on a bounded worker pool, and --per-minute caps how many of them start in any
+minute to stay inside the OpenAI rate limits. Answers are shared with the app
+through the LLM response cache. The exit code is 1 when any query failed.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+from cache import file_content_key
+from cube import AggregateCube
+from dataset_profile import DEFAULT_TOKEN_BUDGET, build_profile
+from fake_llm import FakeLLM
+from figures import FigureCache
+from generate_pdf import generate_pdf_report
+from jobs import DONE, JobExecutor, RateLimiter
+from llm_cache import DEFAULT_CACHE_PATH, ResponseCache
+from preprocess import (STREAMING_THRESHOLD_BYTES, QoSPreprocessor, compact_dtypes, preprocess_csv_streaming,
+                        read_parquet_compact, read_qos_csv)
+from queries import AGENT_OPTIONS, agent_prefix, run_query_job
+from tracing import Trace
+from visuals import POINT_BUDGET
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_MINUTE = 30
+
+
+class FakeAgent:
+    """Stands in for the pandas agent with --fake-llm, answering each query with the fake model."""
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def run(self, query):
+        return self.llm(query)
+
+
+def read_queries(path):
+    """Reads the queries to run, one per line or a JSON list."""
+    with open(path) as f:
+        if path.endswith('.json'):
+            return [str(query).strip() for query in json.load(f) if str(query).strip()]
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def load_dataset(csv_path):
+    """
+    Reads and preprocesses a CSV the way the app does for an upload.
+
+    Files over STREAMING_THRESHOLD_BYTES are preprocessed out of core, so only
+    the compacted result is held in memory.
+
+    Returns:
+    tuple: (df, fingerprint), the compacted frame and the content key of the file.
+    """
+    fingerprint = file_content_key(csv_path)
+    if os.path.getsize(csv_path) > STREAMING_THRESHOLD_BYTES:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            parquet_path = os.path.join(tmp_dir, "preprocessed.parquet")
+            preprocess_csv_streaming(csv_path, parquet_path)
+            df, _ = read_parquet_compact(parquet_path)
+        return df, fingerprint
+    df, _ = compact_dtypes(QoSPreprocessor().fit_transform(read_qos_csv(csv_path)))
+    return df, fingerprint
+
+
+def build_agent(llm, df, profile, fake=False):
+    if fake:
+        return FakeAgent(llm)
+    # Imported here so --fake-llm runs do not need the agent toolkit
+    from langchain_experimental.agents.agent_toolkits.pandas.base import create_pandas_dataframe_agent
+    return create_pandas_dataframe_agent(llm, df, prefix=agent_prefix(profile), **AGENT_OPTIONS)
+
+
+def build_llm(fake=False):
+    if fake:
+        return FakeLLM()
+    from langchain_openai import OpenAI
+    # The key is read from OPENAI_API_KEY
+    return OpenAI(temperature=0)
+
+
+def _limited_query_job(job, limiter, *args, **kwargs):
+    limiter.acquire()
+    job.check_cancelled()
+    return run_query_job(job, *args, **kwargs)
+
+
+def _table_records(table):
+    if table is None or table.empty:
+        return None
+    return json.loads(table.reset_index().to_json(orient='records', date_format='iso'))
+
+
+def run_batch(csv_path, queries, report_path, manifest_path=None, workers=DEFAULT_WORKERS,
+              per_minute=DEFAULT_PER_MINUTE, plots_dir="plots", fake_llm=False, cache_path=DEFAULT_CACHE_PATH,
+              profile_budget=DEFAULT_TOKEN_BUDGET, point_budget=POINT_BUDGET):
+    """
+    Runs queries over a CSV and writes the PDF report and the result manifest.
+
+    Parameters:
+    csv_path (str): QoS CSV to analyze.
+    queries (list): Query strings, answered in this order in the report.
+    report_path (str): Where to write the PDF report.
+    manifest_path (str): Where to write the JSON manifest, or None to skip it.
+    workers (int): Queries running at the same time.
+    per_minute (int): Maximum queries started per minute, or None for no limit.
+    plots_dir (str): Directory the plot PNGs are exported to.
+    fake_llm (bool): Answer with FakeLLM instead of OpenAI, for dry runs.
+    cache_path (str): SQLite file of the LLM response cache.
+    profile_budget (int): Token budget of the dataset profile in the prompts.
+    point_budget (int): Rows above which plots are downsampled or binned.
+
+    Returns:
+    dict: The manifest, with per-query status, response, figure and timings.
+    """
+    started = time.time()
+    upload_trace = Trace(f"upload {csv_path}")
+    with upload_trace.span("read_csv + preprocess_data") as span:
+        df, fingerprint = load_dataset(csv_path)
+        span["rows"] = len(df)
+    with upload_trace.span("aggregate_cube"):
+        cube = AggregateCube.from_frame(df)
+    with upload_trace.span("dataset_profile"):
+        profile = build_profile(df, cube, token_budget=profile_budget)
+    llm = build_llm(fake_llm)
+    with upload_trace.span("agent setup"):
+        agent = build_agent(llm, df, profile, fake_llm)
+
+    response_cache = ResponseCache(cache_path)
+    figure_cache = FigureCache(plots_dir, point_budget=point_budget)
+    executor = JobExecutor(max_workers=workers)
+    limiter = RateLimiter(per_minute)
+    jobs = [
+        executor.submit(query, _limited_query_job, limiter, llm, query, df, cube, agent, fingerprint,
+                        response_cache, figure_cache, Trace(query), profile=profile)
+        for query in queries
+    ]
+    try:
+        for i, job in enumerate(jobs, start=1):
+            job.wait()
+            logger.info("Query %d/%d %s: %s", i, len(jobs), job.status, job.name)
+    except KeyboardInterrupt:
+        for job in jobs:
+            job.cancel()
+        raise
+
+    results = []
+    history = []
+    for job in jobs:
+        entry = {'query': job.name, 'status': job.status}
+        if job.status == DONE:
+            result = job.result
+            fig_path = result['fig_path']
+            if fig_path:
+                # The PNG is exported in the background, a failed export leaves the entry without its image
+                try:
+                    figure_cache.wait(fig_path)
+                except Exception as e:
+                    logger.debug("Plot export for %r failed: %s", job.name, e)
+                if not os.path.exists(fig_path):
+                    logger.warning("No plot image could be exported for %r", job.name)
+                    fig_path = None
+            entry.update(response=result['detailed_response'], table=_table_records(result['table']),
+                         figure=fig_path, trace=result['trace'].to_dict())
+            history.append((job.name, result['detailed_response'], fig_path))
+        else:
+            entry['error'] = str(job.error) if job.error else None
+        results.append(entry)
+
+    report_stats = generate_pdf_report(report_path, plots_dir, history) if history else None
+    manifest = {
+        'csv': csv_path,
+        'fingerprint': fingerprint,
+        'rows': len(df),
+        'report': report_path if history else None,
+        'report_stats': report_stats,
+        'started': started,
+        'total_seconds': time.time() - started,
+        'llm_cache': response_cache.stats(),
+        'upload_trace': upload_trace.to_dict(),
+        'queries': results,
+    }
+    if manifest_path:
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv', help='QoS CSV file to analyze')
+    parser.add_argument('queries', help='text file with one query per line, or a JSON list')
+    parser.add_argument('--report', default='report.pdf', help='where to write the PDF report')
+    parser.add_argument('--manifest', default='results.json', help='where to write the JSON result manifest')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='queries running at the same time')
+    parser.add_argument('--per-minute', type=int, default=DEFAULT_PER_MINUTE,
+                        help='maximum queries started per minute, 0 for no limit')
+    parser.add_argument('--plots-dir', default='plots', help='directory the plot images are exported to')
+    parser.add_argument('--profile-budget', type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help='token budget of the dataset profile added to the prompts')
+    parser.add_argument('--point-budget', type=int, default=POINT_BUDGET,
+                        help='rows above which plots are downsampled or binned on the server')
+    parser.add_argument('--fake-llm', action='store_true', help='answer with a local fake model, for dry runs')
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+    queries = read_queries(args.queries)
+    if not queries:
+        parser.error(f"no queries in {args.queries}")
+    manifest = run_batch(args.csv, queries, args.report, args.manifest, workers=args.workers,
+                         per_minute=args.per_minute or None, plots_dir=args.plots_dir, fake_llm=args.fake_llm,
+                         profile_budget=args.profile_budget, point_budget=args.point_budget)
+
+    failed = [entry for entry in manifest['queries'] if entry['status'] != DONE]
+    print(f"Answered {len(queries) - len(failed)}/{len(queries)} queries in {manifest['total_seconds']:.1f}s, "
+          f"report: {manifest['report']}, manifest: {args.manifest}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
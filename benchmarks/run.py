@@ -0,0 +1,163 @@
+"""
+Benchmarks for ingest, preprocessing, plotting and PDF export.
+
+Run from the repository root:
+
+    python -m benchmarks.run --rows 1000 100000 --history-sizes 1 10 50 --output results.json
+    python -m benchmarks.run --rows 1000 --baseline results.json
+
+Every measurement records wall time and peak traced memory. Results are
+written as JSON so runs can be compared; with --baseline, measurements more
+than --tolerance slower than the baseline are reported and the exit code is 1.
+The LLM is replaced with FakeLLM, and plot images are drawn with Pillow
+instead of Kaleido.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from PIL import Image
+
+from benchmarks.synthetic import write_qos_csv
+from fake_llm import FakeLLM
+from generate_pdf import generate_pdf_report
+from preprocess import preprocess_csv_streaming, preprocess_data, read_qos_csv
+from visuals import PLOT_INTENTS, POINT_BUDGET, generate_plot
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+DEFAULT_HISTORY_SIZES = [1, 10, 50]
+# Above this many rows preprocessing is only benchmarked through the streaming path
+MAX_IN_MEMORY_ROWS = 10_000_000
+
+
+def measure(name, func, **params):
+    """Runs func once and returns its timing record."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record = {'benchmark': name, 'params': params, 'seconds': seconds, 'peak_bytes': peak}
+    print(f"{name:<45} {json.dumps(params):<40} {seconds:9.4f}s {peak / 1024 ** 2:9.1f} MB", file=sys.stderr)
+    return record, result
+
+
+def bench_preprocess(rows, missing_rate, unit_mix, tmp_dir):
+    records = []
+    csv_path = os.path.join(tmp_dir, f"qos_{rows}.csv")
+    write_qos_csv(csv_path, rows, missing_rate=missing_rate, unit_mix=unit_mix)
+    params = {'rows': rows, 'missing_rate': missing_rate}
+    df = None
+    if rows <= MAX_IN_MEMORY_ROWS:
+        record, raw = measure('ingest.read_qos_csv', lambda: read_qos_csv(csv_path), **params)
+        records.append(record)
+        record, df = measure('preprocess.preprocess_data', lambda: preprocess_data(raw), **params)
+        records.append(record)
+    parquet_path = os.path.join(tmp_dir, f"qos_{rows}.parquet")
+    record, _ = measure('preprocess.preprocess_csv_streaming',
+                        lambda: preprocess_csv_streaming(csv_path, parquet_path), **params)
+    records.append(record)
+    os.remove(csv_path)
+    os.remove(parquet_path)
+    return records, df
+
+
+def bench_plots(df, rows, point_budget):
+    records = []
+    # The first figure pays for Plotly's lazy imports, keep that out of the measurements
+    generate_plot("histogram", df.head())
+    for intent, phrase_groups in PLOT_INTENTS:
+        query = " ".join(phrase_groups[0])
+        record, fig = measure(f'plot.{intent}', lambda: generate_plot(query, df, point_budget=point_budget),
+                              rows=rows, point_budget=point_budget)
+        # Size of what the browser and Kaleido receive, which the large-data mode keeps bounded
+        if not isinstance(fig, str):
+            record['figure_bytes'] = len(fig.to_json())
+        records.append(record)
+    return records
+
+
+def bench_pdf(history_sizes, tmp_dir):
+    records = []
+    llm = FakeLLM(default=" ".join(["The latency of video calls stays within target."] * 44))
+    image_path = os.path.join(tmp_dir, "plot.png")
+    Image.new("RGB", (1400, 1000), "white").save(image_path)
+    for size in history_sizes:
+        history = [(f"Query {i} about average latency by application type", llm(f"query {i}"),
+                    image_path if i % 2 else None) for i in range(size)]
+        output_path = os.path.join(tmp_dir, f"report_{size}.pdf")
+        record, _ = measure('pdf.generate_pdf_report',
+                            lambda: generate_pdf_report(output_path, tmp_dir, history), history_size=size)
+        records.append(record)
+    return records
+
+
+def compare(results, baseline, tolerance):
+    """Returns the measurements that got slower than the baseline by more than tolerance."""
+    def key(record):
+        return record['benchmark'], json.dumps(record['params'], sort_keys=True)
+
+    previous = {key(record): record for record in baseline['results']}
+    regressions = []
+    for record in results:
+        old = previous.get(key(record))
+        if old and record['seconds'] > old['seconds'] * (1 + tolerance):
+            regressions.append({**record, 'baseline_seconds': old['seconds']})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='dataset sizes to benchmark, from 10^3 up to 10^8 rows')
+    parser.add_argument('--missing-rate', type=float, default=0.02, help='share of missing cells per column')
+    parser.add_argument('--unit-mix', type=float, nargs=3, default=(0.3, 0.7, 0.0),
+                        metavar=('KBPS', 'MBPS', 'GBPS'), help='probabilities of each bandwidth unit')
+    parser.add_argument('--history-sizes', type=int, nargs='+', default=DEFAULT_HISTORY_SIZES,
+                        help='number of queries in the benchmarked PDF reports')
+    parser.add_argument('--point-budget', type=int, default=POINT_BUDGET,
+                        help='rows above which plots are downsampled or binned on the server')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in args.rows:
+            records, df = bench_preprocess(rows, args.missing_rate, tuple(args.unit_mix), tmp_dir)
+            results.extend(records)
+            if df is not None:
+                results.extend(bench_plots(df, rows, args.point_budget))
+        results.extend(bench_pdf(args.history_sizes, tmp_dir))
+
+    output = {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for record in regressions:
+            print(f"REGRESSION {record['benchmark']} {json.dumps(record['params'])}: "
+                  f"{record['baseline_seconds']:.4f}s -> {record['seconds']:.4f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+APPLICATION_TYPES = [
+    'Video_Call', 'Voice_Call', 'Streaming', 'Emergency_Service', 'Online_Gaming',
+    'Background_Download', 'Web_Browsing', 'IoT_Temperature', 'Video_Streaming',
+    'File_Download', 'VoIP_Call',
+]
+
+# Columns that may be blanked out to simulate missing values
+NULLABLE_COLUMNS = [
+    'Application_Type', 'Signal_Strength', 'Latency',
+    'Required_Bandwidth', 'Allocated_Bandwidth', 'Resource_Allocation',
+]
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def _bandwidth(rng, kbps, unit_mix):
+    """Formats bandwidth values in Kbps as Kbps/Mbps/Gbps strings according to unit_mix."""
+    units = rng.choice(['Kbps', 'Mbps', 'Gbps'], size=len(kbps), p=unit_mix)
+    scale = np.select([units == 'Mbps', units == 'Gbps'], [1e3, 1e6], 1.0)
+    values = np.round(kbps / scale, 3)
+    return pd.Series(values).astype(str).str.removesuffix('.0') + ' ' + units
+
+
+def generate_qos_chunk(rows, start=0, missing_rate=0.0, unit_mix=(0.3, 0.7, 0.0), seed=0):
+    """
+    Generates raw QoS rows with the schema of 'Quality of Service 5G.csv'.
+
+    Parameters:
+    rows (int): Number of rows.
+    start (int): Index of the first row, used for User_ID and Timestamp.
+    missing_rate (float): Share of cells blanked out in each nullable column.
+    unit_mix (tuple): Probabilities of Kbps, Mbps and Gbps bandwidth values.
+    seed (int): Random seed.
+
+    Returns:
+    pd.DataFrame: Raw rows with unit-suffixed string columns.
+    """
+    rng = np.random.default_rng(seed + start)
+    required = rng.integers(30, 20_000, rows).astype(float)
+    allocated = required * rng.uniform(1.0, 1.6, rows)
+    timestamps = pd.Timestamp('2023-09-03 10:00') + pd.to_timedelta(np.arange(start, start + rows) // 100, unit='min')
+    df = pd.DataFrame({
+        'Timestamp': timestamps.strftime('%m/%d/%Y %H:%M'),
+        'User_ID': 'User_' + pd.Series(np.arange(start + 1, start + rows + 1)).astype(str),
+        'Application_Type': rng.choice(APPLICATION_TYPES, rows),
+        'Signal_Strength': pd.Series(rng.integers(-120, -40, rows)).astype(str) + ' dBm',
+        'Latency': pd.Series(rng.integers(1, 120, rows)).astype(str) + ' ms',
+        'Required_Bandwidth': _bandwidth(rng, required, unit_mix),
+        'Allocated_Bandwidth': _bandwidth(rng, allocated, unit_mix),
+        'Resource_Allocation': pd.Series(rng.integers(50, 95, rows)).astype(str) + '%',
+    })
+    if missing_rate:
+        for column in NULLABLE_COLUMNS:
+            df.loc[rng.random(rows) < missing_rate, column] = np.nan
+    return df
+
+
+def write_qos_csv(path, rows, chunk_rows=DEFAULT_CHUNK_ROWS, **kwargs):
+    """
+    Writes a synthetic QoS CSV chunk by chunk, so 10^8 rows never sit in memory at once.
+
+    Parameters:
+    path (str): CSV file to write.
+    rows (int): Total number of rows.
+    chunk_rows (int): Rows generated and written per chunk.
+    kwargs: Passed to generate_qos_chunk.
+    """
+    for start in range(0, rows, chunk_rows):
+        chunk = generate_qos_chunk(min(chunk_rows, rows - start), start=start, **kwargs)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
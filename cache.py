@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from pyarrow import feather
+
+from preprocess import PREPROCESS_VERSION, STRING_DTYPE
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "dataframes")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def content_key(data, version=PREPROCESS_VERSION):
+    """
+    Builds the cache key for an uploaded file.
+
+    Parameters:
+    data (bytes): Raw bytes of the uploaded CSV.
+    version (str): Preprocessing version, so a change in preprocess.py
+        invalidates everything cached by an older version.
+
+    Returns:
+    str: Hex digest identifying the file and preprocessing version.
+    """
+    digest = hashlib.sha256(data)
+    digest.update(f"preprocess-v{version}".encode())
+    return digest.hexdigest()
+
+
+def file_content_key(path, version=PREPROCESS_VERSION, block_size=1024 * 1024):
+    """content_key of a file on disk, hashed block by block instead of reading it whole."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    digest.update(f"preprocess-v{version}".encode())
+    return digest.hexdigest()
+
+
+class DataFrameCache:
+    """
+    Two-level cache of preprocessed DataFrames keyed on file content.
+
+    Recently used frames are held in an in-memory LRU bounded by max_bytes.
+    Every frame is also written to a Feather file under cache_dir, so a frame
+    evicted from memory (or lost on restart) is loaded back with a memory map
+    instead of being parsed and preprocessed again. The files are trimmed to
+    max_disk_bytes, least recently used first.
+
+    Frames are shared between callers, not copied, and must not be modified.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.feather")
+
+    def _remember(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        if key in self._frames:
+            self._total_bytes -= self._sizes.pop(key)
+            del self._frames[key]
+        self._frames[key] = df
+        self._sizes[key] = size
+        self._total_bytes += size
+        # Evict least recently used frames until we are back under budget
+        while self._total_bytes > self.max_bytes:
+            old_key, _ = self._frames.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(old_key)
+
+    def _touch(self, path):
+        # The file's mtime is its last use, so the disk trim keeps it
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _trim_disk(self, keep=None):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".feather") and path != keep:
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total_bytes = sum(size for _, size, _ in files) + (os.path.getsize(keep) if keep else 0)
+        for _, size, path in files:
+            if total_bytes <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+
+    def get(self, key):
+        """Returns the cached frame for key, shared and read-only, or None on a miss."""
+        with self._lock:
+            path = self._path(key)
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                self._touch(path)
+                return self._frames[key]
+            if not os.path.exists(path):
+                return None
+            self._touch(path)
+            df = feather.read_table(path, memory_map=True).to_pandas()
+            # Arrow-backed string columns are restored as Python-backed strings
+            string_columns = df.select_dtypes(include=['string']).columns
+            df[string_columns] = df[string_columns].astype(STRING_DTYPE)
+            self._remember(key, df)
+            return df
+
+    def put(self, key, df):
+        """Stores df in memory and spills it to disk."""
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            # Uncompressed so the file can be memory mapped on the next load
+            df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+            self._trim_disk(keep=path)
+            self._remember(key, df)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the preprocessed frame for key, computing it on a miss.
+
+        Parameters:
+        key (str): Content key of the upload, see content_key.
+        compute (callable): Called with no arguments to build the frame.
+
+        Returns:
+        pd.DataFrame: The preprocessed frame.
+        """
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            self.put(key, df)
+        return df
+
+    def clear(self):
+        """Drops every cached frame, in memory and on disk."""
+        with self._lock:
+            self._frames.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".feather"):
+                    os.remove(os.path.join(self.cache_dir, name))
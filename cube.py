@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_SAMPLE_SIZE = 1024
+
+
+class AggregateCube:
+    """
+    Materialized per-group summary of the numeric QoS columns.
+
+    For every Application_Type (and optionally every Timestamp bucket) the
+    cube keeps count, sum, sum of squares, min and max of each numeric column,
+    plus a bottom-k row sample per group for approximate quantiles. All of
+    these merge exactly, so appending rows with update() only touches the new
+    rows, and reads cost O(groups) instead of O(rows).
+    """
+
+    def __init__(self, group_by='Application_Type', time_column='Timestamp', time_bucket=None,
+                 sample_size=DEFAULT_SAMPLE_SIZE, seed=0):
+        self.group_by = group_by
+        self.time_column = time_column
+        self.time_bucket = time_bucket
+        self.sample_size = sample_size
+        self.columns = None
+        self.rows = 0
+        self._rng = np.random.default_rng(seed)
+        self._sizes = None
+        self._counts = None
+        self._sums = None
+        self._squares = None
+        self._mins = None
+        self._maxs = None
+        self._sample = None
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Builds a cube over every row of df."""
+        cube = cls(**kwargs)
+        cube.update(df)
+        return cube
+
+    @property
+    def keys(self):
+        return [self.group_by, 'Time_Bucket'] if self.time_bucket else [self.group_by]
+
+    def _keyed(self, df):
+        # Aggregate in float64 so sums over compact float32/int8 columns do not lose precision
+        frame = df[[self.group_by] + list(self.columns)].astype({column: 'float64' for column in self.columns})
+        if self.time_bucket:
+            frame = frame.assign(Time_Bucket=df[self.time_column].dt.floor(self.time_bucket))
+        return frame
+
+    @staticmethod
+    def _merge(old, new, how):
+        if old is None:
+            return new
+        if how == 'sum':
+            return old.add(new, fill_value=0)
+        combined = pd.concat([old, new]).groupby(level=list(range(new.index.nlevels)), observed=True)
+        return combined.min() if how == 'min' else combined.max()
+
+    def update(self, df):
+        """
+        Folds newly appended rows into the cube.
+
+        Parameters:
+        df (pd.DataFrame): Preprocessed rows not yet seen by the cube.
+        """
+        if df.empty:
+            return
+        if self.columns is None:
+            self.columns = [column for column in df.select_dtypes(include=['number']).columns
+                            if column != self.group_by]
+        frame = self._keyed(df)
+        grouped = frame.groupby(self.keys, observed=True)[self.columns]
+        squares = (frame[self.columns] ** 2).join(frame[self.keys]).groupby(self.keys, observed=True)[self.columns].sum()
+
+        self._sizes = self._merge(self._sizes, grouped.size(), 'sum')
+        self._counts = self._merge(self._counts, grouped.count(), 'sum')
+        self._sums = self._merge(self._sums, grouped.sum(), 'sum')
+        self._squares = self._merge(self._squares, squares, 'sum')
+        self._mins = self._merge(self._mins, grouped.min(), 'min')
+        self._maxs = self._merge(self._maxs, grouped.max(), 'max')
+
+        # Bottom-k sampling on random priorities: the k smallest priorities of the
+        # union are the k smallest of each part, so samples merge exactly on append
+        sample = frame.assign(_priority=self._rng.random(len(frame)))
+        if self._sample is not None:
+            sample = pd.concat([self._sample, sample], ignore_index=True)
+        sample = sample.sort_values('_priority')
+        self._sample = sample[sample.groupby(self.keys, observed=True).cumcount() < self.sample_size]
+        self.rows += len(df)
+
+    def _collapse(self, table, how='sum', by_time=False):
+        if by_time or not self.time_bucket:
+            return table
+        grouped = table.groupby(level=self.group_by, observed=True)
+        return getattr(grouped, how)()
+
+    def counts(self, by_time=False):
+        """Number of rows per group, most frequent first."""
+        sizes = self._collapse(self._sizes, by_time=by_time)
+        return sizes.astype('int').sort_values(ascending=False, kind='stable').rename('count')
+
+    def mean(self, column, by_time=False):
+        """Mean of column per group, indexed and sorted by group."""
+        sums = self._collapse(self._sums, by_time=by_time)[column]
+        counts = self._collapse(self._counts, by_time=by_time)[column]
+        return (sums / counts).rename(column)
+
+    def stats(self, column, by_time=False):
+        """
+        Summary of one column per group.
+
+        Parameters:
+        column (str): Numeric column to summarize.
+        by_time (bool): Keep the time buckets instead of collapsing them.
+
+        Returns:
+        pd.DataFrame: count, sum, mean, std, min, 25%, 50%, 75% and max per group.
+        """
+        count = self._collapse(self._counts, by_time=by_time)[column]
+        total = self._collapse(self._sums, by_time=by_time)[column]
+        squares = self._collapse(self._squares, by_time=by_time)[column]
+        variance = (squares - total ** 2 / count) / (count - 1)
+        table = pd.DataFrame({
+            'count': count.astype('int'),
+            'sum': total,
+            'mean': total / count,
+            'std': np.sqrt(variance.clip(lower=0)),
+            'min': self._collapse(self._mins, 'min', by_time)[column],
+        })
+        quantiles = self.quantiles(column, by_time=by_time)
+        for q in quantiles.columns:
+            table[f"{q:.0%}"] = quantiles[q]
+        table['max'] = self._collapse(self._maxs, 'max', by_time)[column]
+        return table
+
+    def quantiles(self, column, q=(0.25, 0.5, 0.75), by_time=False):
+        """Approximate quantiles of column per group, estimated from the row sample."""
+        keys = self.keys if by_time else [self.group_by]
+        table = self._sample.groupby(keys, observed=True)[column].quantile(list(q)).unstack()
+        return table
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+# Rough size of a token in characters, close enough for English text and numbers
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 800
+
+QOS_METRICS = ['Signal_Strength', 'Latency', 'Required_Bandwidth', 'Allocated_Bandwidth',
+               'Resource_Allocation', 'Bandwidth_Utilization_Ratio']
+# Metrics shown per group, the rest are covered by the per-column stats
+GROUP_METRICS = ['Latency', 'Signal_Strength', 'Required_Bandwidth', 'Allocated_Bandwidth']
+TOP_VALUES = 3
+
+
+def estimate_tokens(text):
+    """Approximate number of tokens text takes up in a prompt."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _number(value):
+    if pd.isna(value):
+        return "nan"
+    return f"{value:.4g}"
+
+
+def _column_lines(df):
+    """One line per column with its dtype and summary stats, the QoS metrics first."""
+    numeric, other = [], []
+    for column, dtype in df.dtypes.items():
+        values = df[column]
+        name = f"{column} ({dtype})"
+        if pd.api.types.is_numeric_dtype(values):
+            # Ratios divide by zero bandwidth, infinite values would swamp the stats
+            missing = int(values.isna().sum())
+            values = values.astype('float64').replace([np.inf, -np.inf], np.nan)
+            numeric.append(f"{name}: mean {_number(values.mean())}, std {_number(values.std())}, "
+                         f"min {_number(values.min())}, max {_number(values.max())}, missing {missing}")
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            other.append(f"{name}: {values.min()} to {values.max()}")
+        else:
+            counts = values.value_counts()
+            top = ", ".join(f"{value} ({count})" for value, count in counts.head(TOP_VALUES).items())
+            other.append(f"{name}: {len(counts)} distinct, top {top}")
+    return numeric + other
+
+
+def _group_lines(df, group_by, cube=None):
+    metrics = [column for column in GROUP_METRICS if column in df.columns]
+    if cube is not None:
+        counts = cube.counts()
+        means = pd.DataFrame({column: cube.mean(column) for column in metrics if column in cube.columns})
+    else:
+        counts = df[group_by].value_counts()
+        means = df.groupby(group_by, observed=True)[metrics].mean()
+    lines = []
+    # Most frequent groups first, so the budget cuts the rarest ones
+    for group, count in counts.items():
+        stats = ", ".join(f"{column} {_number(means.at[group, column])}" for column in means.columns)
+        lines.append(f"{group}: {count} rows ({count / counts.sum():.1%}), mean {stats}")
+    return lines
+
+
+def _correlation_lines(df):
+    metrics = [column for column in QOS_METRICS if column in df.columns]
+    if len(metrics) < 2:
+        return []
+    corr = df[metrics].astype('float64').replace([np.inf, -np.inf], np.nan).corr()
+    pairs = [(corr.iat[i, j], metrics[i], metrics[j])
+             for i in range(len(metrics)) for j in range(i + 1, len(metrics))]
+    # Strongest relationships first, either sign
+    pairs.sort(key=lambda pair: -abs(pair[0]) if pd.notna(pair[0]) else 0)
+    return [f"{a} ~ {b}: {_number(r)}" for r, a, b in pairs]
+
+
+def build_profile(df, cube=None, group_by='Application_Type', token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Builds a compact text profile of the dataset for LLM prompts.
+
+    The sections are the columns with their dtypes and stats, per-group
+    counts and means, and metric correlations, each with its most useful
+    lines first. Lines are taken from the sections in turn until the next one
+    would exceed the token budget, so a tight budget shortens every section
+    instead of dropping the last ones, and truncated sections say how many
+    lines they show.
+
+    Parameters:
+    df (pd.DataFrame): The preprocessed dataset.
+    cube (AggregateCube): Optional precomputed per-group aggregates of df.
+    group_by (str): Column the per-group section is computed over.
+    token_budget (int): Maximum size of the profile in tokens, see estimate_tokens.
+
+    Returns:
+    str: The profile text.
+    """
+    sections = [(f"Columns of df, {len(df)} rows", _column_lines(df))]
+    if group_by in df.columns:
+        sections.append((f"By {group_by}", _group_lines(df, group_by, cube)))
+    sections.append(("Correlations between QoS metrics", _correlation_lines(df)))
+
+    budget = token_budget * CHARS_PER_TOKEN
+    # Room for a section header and its "(n of m)" note
+    header_size = max(len(title) for title, _ in sections) + 16
+    kept = [[] for _ in sections]
+    full = [not lines for _, lines in sections]
+    used = 0
+    while not all(full):
+        for i, (_, lines) in enumerate(sections):
+            if full[i]:
+                continue
+            line = f"- {lines[len(kept[i])]}"
+            cost = len(line) + 1 + (0 if kept[i] else header_size)
+            if used + cost > budget:
+                full[i] = True
+                continue
+            kept[i].append(line)
+            used += cost
+            full[i] = len(kept[i]) == len(lines)
+
+    parts = []
+    for (title, lines), section in zip(sections, kept):
+        if not section:
+            continue
+        note = f" ({len(section)} of {len(lines)})" if len(section) < len(lines) else ""
+        parts.append("\n".join([f"{title}{note}:"] + section))
+    return "\n".join(parts)
@@ -0,0 +1,37 @@
+import re
+
+
+class FakeLLM:
+    """
+    Local stand-in for the OpenAI LLM, for tests and offline runs.
+
+    It is called like the LangChain LLM (llm(prompt) or llm.invoke(prompt))
+    and answers from a dict of canned responses, falling back to a default.
+    stream(prompt) yields the same answer word by word, like llm.stream().
+    Every prompt is recorded in calls so tests can count round-trips.
+    """
+
+    def __init__(self, responses=None, default="Fake response.", model_name="fake-llm", temperature=0):
+        self.responses = responses or {}
+        self.default = default
+        self.model_name = model_name
+        self.temperature = temperature
+        self.calls = []
+
+    def _respond(self, prompt):
+        self.calls.append(prompt)
+        for key, response in self.responses.items():
+            if key in prompt:
+                return response
+        return self.default
+
+    def __call__(self, prompt, **kwargs):
+        return self._respond(prompt)
+
+    def invoke(self, prompt, **kwargs):
+        return self._respond(prompt)
+
+    def stream(self, prompt, **kwargs):
+        # Words keep their trailing whitespace, so joining the chunks gives back the response
+        for chunk in re.findall(r"\s*\S+\s*", self._respond(prompt)):
+            yield chunk
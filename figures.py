@@ -0,0 +1,144 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+
+from visuals import PLOT_TEMPLATE, POINT_BUDGET, generate_plot, match_intent
+
+DEFAULT_MAX_FIGURES = 64
+DEFAULT_MAX_FILES = 200
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+class FigureCache:
+    """
+    Renders each distinct plot once and exports PNGs in the background.
+
+    Figures are keyed on (plot intent, data fingerprint, template, point
+    budget), so the same chart requested by differently worded queries is
+    built once and written to a single plots/plot_<key>.png. PNG export runs on a worker pool, and the
+    plots directory is trimmed to max_files / max_bytes, least recently used
+    files first.
+    """
+
+    def __init__(self, plots_dir="plots", max_workers=2, max_figures=DEFAULT_MAX_FIGURES,
+                 max_files=DEFAULT_MAX_FILES, max_bytes=DEFAULT_MAX_BYTES, point_budget=POINT_BUDGET):
+        self.plots_dir = plots_dir
+        self.point_budget = point_budget
+        self.max_figures = max_figures
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()
+        self._exports = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plot-export")
+        os.makedirs(plots_dir, exist_ok=True)
+
+    @staticmethod
+    def figure_key(intent, fingerprint, template=PLOT_TEMPLATE, point_budget=POINT_BUDGET):
+        return hashlib.sha256(f"{intent}|{fingerprint}|{template}|{point_budget}".encode()).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.plots_dir, f"plot_{key}.png")
+
+    def get_figure(self, query, df, fingerprint, cube=None, on_exported=None):
+        """
+        Returns the figure for a query and the path its PNG is exported to.
+
+        Parameters:
+        query (str): The user's query.
+        df (pd.DataFrame): The dataset.
+        fingerprint (str): Content key of df.
+        cube (AggregateCube): Optional precomputed aggregates of df.
+        on_exported (callable): Called with the export's wall seconds when this
+            call starts a PNG export, on the export thread once the file is written.
+
+        Returns:
+        tuple: (figure, png_path), or (message, None) when no plot matches.
+        """
+        intent = match_intent(query)
+        if intent is None:
+            return generate_plot(query, df, cube, self.point_budget), None
+        key = self.figure_key(intent, fingerprint, point_budget=self.point_budget)
+        path = self._path(key)
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+        if fig is None:
+            fig = generate_plot(query, df, cube, self.point_budget)
+            if not isinstance(fig, go.Figure):
+                return fig, None
+            with self._lock:
+                self._figures[key] = fig
+                while len(self._figures) > self.max_figures:
+                    self._figures.popitem(last=False)
+        self._schedule_export(fig, path, on_exported)
+        return fig, path
+
+    def _schedule_export(self, fig, path, on_exported=None):
+        with self._lock:
+            if path in self._exports:
+                return
+            if os.path.exists(path):
+                # Mark the file as recently used so cleanup keeps it
+                os.utime(path)
+                return
+            self._exports[path] = self._executor.submit(self._export, fig, path, on_exported)
+
+    def _export(self, fig, path, on_exported=None):
+        tmp_path = f"{path}.tmp.png"
+        try:
+            start = time.perf_counter()
+            fig.write_image(tmp_path)
+            os.replace(tmp_path, path)
+            seconds = time.perf_counter() - start
+            # Reported before the future resolves, so wait() returns with the time recorded
+            if on_exported is not None:
+                on_exported(seconds)
+            self.cleanup(keep=path)
+        finally:
+            with self._lock:
+                self._exports.pop(path, None)
+
+    def wait(self, path=None):
+        """Blocks until the export of path, or every pending export, has finished."""
+        with self._lock:
+            if path is None:
+                futures = list(self._exports.values())
+            else:
+                futures = [self._exports[path]] if path in self._exports else []
+        for future in futures:
+            future.result()
+
+    def when_exported(self, path, callback):
+        """Calls callback() once the pending export of path has finished, or at once when none is pending."""
+        with self._lock:
+            future = self._exports.get(path)
+        if future is None:
+            callback()
+        else:
+            future.add_done_callback(lambda _: callback())
+
+    def cleanup(self, keep=None):
+        """Deletes the least recently used PNGs until the directory is under its caps."""
+        with self._lock:
+            files = []
+            for name in os.listdir(self.plots_dir):
+                path = os.path.join(self.plots_dir, name)
+                if name.endswith(".png") and not name.endswith(".tmp.png") and path != keep:
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+            files.sort()
+            total_files = len(files) + (1 if keep else 0)
+            total_bytes = sum(size for _, size, _ in files) + (os.path.getsize(keep) if keep else 0)
+            for _, size, path in files:
+                if total_files <= self.max_files and total_bytes <= self.max_bytes:
+                    break
+                os.remove(path)
+                total_files -= 1
+                total_bytes -= size
@@ -1,113 +1,276 @@
 from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
+from PIL import Image
+import hashlib
+import io
 import os
+import threading
+from functools import lru_cache
 
-def draw_wrapped_text(c, text, x, y, max_width, line_height, footer_height, page_height):
-    """Draw text with word wrapping, ensuring it does not overlap with footer."""
-    lines = text.split('\n')
-    for line in lines:
-        words = line.split()
-        line_buffer = ""
-        for word in words:
-            test_line = f"{line_buffer} {word}".strip()
-            if c.stringWidth(test_line, "Helvetica", 12) <= max_width:
-                line_buffer = test_line
+LEFT_MARGIN = 40
+RIGHT_MARGIN = 40
+FOOTER_HEIGHT = 20
+LINE_HEIGHT = 15
+IMAGE_WIDTH = 380
+IMAGE_HEIGHT = 200
+REPORT_TITLE = "My GENIE Insights"
+IMAGE_DPI = 150
+IMAGE_QUALITY = 85
+
+@lru_cache(maxsize=None)
+def _glyph_widths(font, size):
+    """Per (font, size) table of glyph widths, filled as characters are first seen."""
+    return {}
+
+@lru_cache(maxsize=65536)
+def word_width(word, font="Helvetica", size=12):
+    """Width of a single word, summed from cached glyph widths."""
+    widths = _glyph_widths(font, size)
+    total = 0
+    for char in word:
+        width = widths.get(char)
+        if width is None:
+            width = widths[char] = stringWidth(char, font, size)
+        total += width
+    return total
+
+def wrap_text(text, max_width, font="Helvetica", size=12):
+    """Split text into lines that fit within max_width, measuring each word once."""
+    space_width = word_width(" ", font, size)
+    wrapped = []
+    for line in text.split('\n'):
+        line_words = []
+        line_width = 0
+        for word in line.split():
+            width = word_width(word, font, size)
+            # Greedy breaking: start a new line when the word plus a space does not fit
+            if line_words and line_width + space_width + width > max_width:
+                wrapped.append(" ".join(line_words))
+                line_words = [word]
+                line_width = width
+            elif line_words:
+                line_words.append(word)
+                line_width += space_width + width
             else:
-                if y - line_height < footer_height + 10:
-                    # Start a new page
-                    c.showPage()
-                    reset_page_header(c)
-                    y = page_height - 60
-                
-                c.drawString(x, y, line_buffer)
-                y -= line_height
-                line_buffer = word
-        
-        if line_buffer:
-            if y - line_height < footer_height + 10:
-                c.showPage()
-                reset_page_header(c)
-                y = page_height - 60
+                line_words = [word]
+                line_width = width
+        if line_words:
+            wrapped.append(" ".join(line_words))
+    return wrapped
 
-            c.drawString(x, y, line_buffer)
-            y -= line_height
+def draw_wrapped_text(c, text, x, y, max_width, line_height, footer_height, page_height):
+    """Draw text with word wrapping, ensuring it does not overlap with footer."""
+    # Measure with the font currently set on the canvas
+    font, size = c._fontname, c._fontsize
+    for line in wrap_text(text, max_width, font, size):
+        if y - line_height < footer_height + 10:
+            # Start a new page
+            c.showPage()
+            reset_page_header(c)
+            c.setFont(font, size)
+            y = page_height - 60
+        c.drawString(x, y, line)
+        y -= line_height
     return y
 
-def reset_page_header(c):
+def reset_page_header(c, left_margin=LEFT_MARGIN, right_margin=RIGHT_MARGIN, pagesize=letter):
     """Re-add the title and line for a new page."""
-    width, height = letter
-    title = "My GENIE Insights"
+    width, height = pagesize
     c.setFont("Helvetica", 12)
-    title_x = width / 2 - c.stringWidth(title, "Helvetica-Bold", 16) / 2
-    c.drawString(title_x, height - 30, title)
+    title_x = width / 2 - c.stringWidth(REPORT_TITLE, "Helvetica-Bold", 16) / 2
+    c.drawString(title_x, height - 30, REPORT_TITLE)
     c.line(left_margin, height - 35, width - right_margin, height - 35)
 
-def generate_pdf_report(output_filename, plots_dir, query_history):
-    c = canvas.Canvas(output_filename, pagesize=letter)
-    global width, height, left_margin, right_margin, content_width
-    width, height = letter
-    left_margin = 40
-    right_margin = 40
-    content_width = width - left_margin - right_margin
-    footer_height = 20
+class ImagePipeline:
+    """
+    Prepares plot images for embedding in the report.
 
-    reset_page_header(c)
-    y_position = height - 60  # Start position below the title
+    Each source file is resampled to the DPI it is printed at, flattened onto
+    white and re-encoded as JPEG, keyed on a hash of its contents so the same
+    chart saved under several names is prepared and embedded only once.
+    """
 
-    for entry in query_history:
-        query = entry[0]
-        response = entry[1]
-        img_path = entry[2] if len(entry) > 2 else None
+    def __init__(self, dpi=IMAGE_DPI, quality=IMAGE_QUALITY):
+        self.dpi = dpi
+        self.quality = quality
+        self._prepared = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, img_path, width, height):
+        """
+        Returns (key, jpeg_bytes, source_size) for img_path printed at width x height points.
+        """
+        with open(img_path, "rb") as f:
+            data = f.read()
+        key = hashlib.sha256(data).hexdigest()[:32] + f"_{width}x{height}"
+        with self._lock:
+            if key in self._prepared:
+                return key, self._prepared[key], len(data)
+        image = Image.open(io.BytesIO(data))
+        image.thumbnail((int(width * self.dpi / 72), int(height * self.dpi / 72)), Image.LANCZOS)
+        if image.mode != "RGB":
+            background = Image.new("RGB", image.size, "white")
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        prepared = buffer.getvalue()
+        # Keep the original when re-encoding would not make it smaller
+        if len(prepared) >= len(data):
+            prepared = data
+        with self._lock:
+            self._prepared[key] = prepared
+        return key, prepared, len(data)
+
+class ReportBuilder:
+    """
+    Builds the PDF report incrementally from query history entries.
+
+    Each entry is wrapped and paginated once, the first time a report is built
+    after it was added, and the resulting pages are kept as lists of drawing
+    operations. Building a report replays the finished pages onto a fresh
+    canvas, so pressing the button again only lays out the new entries. All
+    page geometry lives on the instance and access is guarded by a lock, so
+    several sessions can build reports at the same time.
+    """
+
+    def __init__(self, pagesize=letter, left_margin=LEFT_MARGIN, right_margin=RIGHT_MARGIN,
+                 footer_height=FOOTER_HEIGHT):
+        self.width, self.height = pagesize
+        self.left_margin = left_margin
+        self.right_margin = right_margin
+        self.content_width = self.width - left_margin - right_margin
+        self.footer_height = footer_height
+        self._pending = []
+        self._entries = 0
+        self._pages = [[]]
+        self._y = self.height - 60  # Start position below the title
+        self._lock = threading.Lock()
+        self.images = ImagePipeline()
+        self.image_stats = {}
+
+    def __len__(self):
+        return self._entries
+
+    def add_entry(self, query, response, img_path=None):
+        """Queue a query/response/image section for the report."""
+        with self._lock:
+            self._pending.append((query, response, img_path))
+            self._entries += 1
 
+    def _new_page(self):
+        self._pages.append([])
+        self._y = self.height - 60  # Reset position for the new page
+
+    def _add_text(self, text, font, size):
+        for line in wrap_text(text, self.content_width, font, size):
+            if self._y - LINE_HEIGHT < self.footer_height + 10:
+                self._new_page()
+            self._pages[-1].append(("text", font, size, self.left_margin, self._y, line))
+            self._y -= LINE_HEIGHT
+
+    def _layout_entry(self, query, response, img_path):
         # Add the query
-        c.setFont("Helvetica-Bold", 14)
-        y_position = draw_wrapped_text(c, "Query:", left_margin, y_position, content_width, 15, footer_height, height)
-        c.setFont("Helvetica", 12)
-        y_position = draw_wrapped_text(c, query, left_margin, y_position, content_width, 15, footer_height, height)
-        y_position -= 10  # Space between query and response
+        self._add_text("Query:", "Helvetica-Bold", 14)
+        self._add_text(query, "Helvetica", 12)
+        self._y -= 10  # Space between query and response
 
         # Add the response
-        c.setFont("Helvetica-Bold", 14)
-        y_position = draw_wrapped_text(c, "Response:", left_margin, y_position, content_width, 15, footer_height, height)
+        self._add_text("Response:", "Helvetica-Bold", 14)
 
         # Check if the response starts on a new page
-        if y_position < footer_height + 15:  # Less than 15 points for response
-            c.showPage()
-            reset_page_header(c)
-            y_position = height - 60  # Reset position for the new page
-
-        # Ensure that the font is set to regular before the response
-        c.setFont("Helvetica", 12)
-        y_position = draw_wrapped_text(c, response, left_margin, y_position, content_width, 15, footer_height, height)
+        if self._y < self.footer_height + 15:  # Less than 15 points for response
+            self._new_page()
+        self._add_text(response, "Helvetica", 12)
 
         # Check if the image file exists before adding
         if img_path and os.path.exists(img_path):
-            image_height = 200  # Height of the image
-            space_needed = image_height + 10  # Image height + additional space
+            space_needed = IMAGE_HEIGHT + 10  # Image height + additional space
 
             # Check if there is enough space for the image and some padding
-            if y_position < footer_height + space_needed + 10:  # Check for footer space
-                c.showPage()
-                reset_page_header(c)
-                y_position = height - 60  # Reset position for the new page
+            if self._y < self.footer_height + space_needed + 10:  # Check for footer space
+                self._new_page()
 
-            # Draw padding before the image
-            y_position -= 200  # Space before the image
+            self._y -= IMAGE_HEIGHT  # Space before the image
 
             # Center the image
-            image_x = (width - 380) / 2
-            c.drawImage(img_path, image_x, y_position, width=380, height=image_height, preserveAspectRatio=True)
-            y_position -= (image_height + 10)  # Space for the image plus extra padding
+            image_x = (self.width - IMAGE_WIDTH) / 2
+            self._pages[-1].append(("image", img_path, image_x, self._y, IMAGE_WIDTH, IMAGE_HEIGHT))
+            self._y -= (IMAGE_HEIGHT + 10)  # Space for the image plus extra padding
 
-        y_position -= 10  # Space after the image
+        self._y -= 10  # Space after the image
 
-        if y_position < footer_height + 40:  # Ensuring footer space
-            c.showPage()
-            reset_page_header(c)
-            y_position = height - 60  # Reset position for the new page
+        if self._y < self.footer_height + 40:  # Ensuring footer space
+            self._new_page()
+
+    def _draw_image(self, c, forms, stats, img_path, x, y, width, height):
+        if not os.path.exists(img_path):
+            return
+        key, prepared, source_size = self.images.prepare(img_path, width, height)
+        stats["images"] += 1
+        stats["original_bytes"] += source_size
+        # Every unique image is stored once as a form XObject and referenced from each page
+        if key not in forms:
+            forms.add(key)
+            stats["embedded_bytes"] += len(prepared)
+            c.beginForm(key)
+            c.drawImage(ImageReader(io.BytesIO(prepared)), 0, 0, width=width, height=height,
+                        preserveAspectRatio=True)
+            c.endForm()
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(key)
+        c.restoreState()
+
+    def _draw_page(self, c, operations, forms, stats):
+        reset_page_header(c, self.left_margin, self.right_margin, (self.width, self.height))
+        for operation in operations:
+            if operation[0] == "text":
+                _, font, size, x, y, line = operation
+                c.setFont(font, size)
+                c.drawString(x, y, line)
+            else:
+                self._draw_image(c, forms, stats, *operation[1:])
 
-    add_footer(c, left_margin)  # Add footer on the last page
-    c.save()
+    def build(self, output_filename):
+        """
+        Lay out any new entries and write the full report to output_filename.
+
+        Returns:
+        dict: Image embedding counts and the bytes saved by resampling and dedup.
+        """
+        with self._lock:
+            for entry in self._pending:
+                self._layout_entry(*entry)
+            self._pending = []
+            pages = [list(page) for page in self._pages]
+
+        c = canvas.Canvas(output_filename, pagesize=(self.width, self.height))
+        forms = set()
+        stats = {"images": 0, "original_bytes": 0, "embedded_bytes": 0}
+        for i, operations in enumerate(pages):
+            if i:
+                c.showPage()
+            self._draw_page(c, operations, forms, stats)
+        add_footer(c, self.left_margin)  # Add footer on the last page
+        c.save()
+
+        stats["unique_images"] = len(forms)
+        stats["bytes_saved"] = stats["original_bytes"] - stats["embedded_bytes"]
+        self.image_stats = stats
+        return stats
+
+def generate_pdf_report(output_filename, plots_dir, query_history):
+    builder = ReportBuilder()
+    for entry in query_history:
+        query = entry[0]
+        response = entry[1]
+        img_path = entry[2] if len(entry) > 2 else None
+        builder.add_entry(query, response, img_path)
+    return builder.build(output_filename)
 
 def add_footer(c, left_margin):
     """Draw the footer at the bottom of the page."""
@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "sessions.sqlite")
+
+COLUMNS = ("id", "session_id", "created", "query", "response", "fig_path", "total_ms", "trace")
+
+
+class SessionStore:
+    """
+    Persistent, append-only store of query history.
+
+    Every answered query is one row holding the query, the response, the path
+    of its figure and its timings, tagged with the session it belongs to. Rows
+    are never updated, so a restarted app finds each session's history intact,
+    and pages are read by rowid so the UI only loads the entries it shows.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit serves sessions from several threads, access goes through _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, created REAL NOT NULL, "
+            "query TEXT NOT NULL, response TEXT NOT NULL, fig_path TEXT, total_ms REAL, trace TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_session ON history (session_id, id)")
+        self._conn.commit()
+
+    def append(self, session_id, query, response, fig_path=None, trace=None):
+        """
+        Adds an answered query to a session's history.
+
+        Parameters:
+        session_id (str): Session the entry belongs to.
+        query (str): The user's query.
+        response (str): The detailed response shown for it.
+        fig_path (str): PNG of the query's visualization, if any.
+        trace (dict): Timings of the query, see Trace.to_dict.
+
+        Returns:
+        int: Id of the new entry.
+        """
+        total_ms = trace.get("total_ms") if trace else None
+        trace_json = json.dumps(trace, default=str) if trace else None
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO history (session_id, created, query, response, fig_path, total_ms, trace) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, time.time(), query, response, fig_path, total_ms, trace_json),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def count(self, session_id):
+        """Number of entries in a session's history."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM history WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+
+    def page(self, session_id, offset=0, limit=10):
+        """
+        Reads a window of a session's history, oldest first.
+
+        Parameters:
+        session_id (str): Session to read.
+        offset (int): Entries to skip from the start of the history.
+        limit (int): Maximum number of entries to return, or None for all.
+
+        Returns:
+        list: Entries as dicts with the columns of the store, each with its
+        1-based position in the history as "number".
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM history WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?",
+                (session_id, -1 if limit is None else limit, offset),
+            ).fetchall()
+        entries = []
+        for number, row in enumerate(rows, start=offset + 1):
+            entry = dict(zip(COLUMNS, row))
+            entry["trace"] = json.loads(entry["trace"]) if entry["trace"] else None
+            entry["number"] = number
+            entries.append(entry)
+        return entries
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from preprocess import SCALED_COLUMNS
+from visuals import match_intent
+
+
+def _application_mean(df, column, cube=None):
+    if cube is not None:
+        means = cube.mean(column)
+    else:
+        means = df.groupby('Application_Type', observed=True)[column].mean()
+    return means.sort_values(ascending=False).reset_index()
+
+
+def _describe(df, column):
+    return df[column].describe().to_frame().reset_index().rename(columns={'index': 'Statistic'})
+
+
+def _unit_note(column):
+    if column in SCALED_COLUMNS:
+        return f" Values of {column} are standardized (z-scores), as in the preprocessed dataset."
+    return ""
+
+
+def _format_rows(table, label, value):
+    return ", ".join(f"{row[label]}: {row[value]:.2f}" for _, row in table.iterrows())
+
+
+def _avg_bandwidth_online_gaming(df, cube=None):
+    # Application types are stored with underscores, e.g. 'Online_Gaming'
+    names = df['Application_Type'].astype(str).str.replace('_', ' ').str.lower()
+    subset = df[names == 'online gaming']
+    if subset.empty:
+        return pd.DataFrame(), "There are no Online Gaming records in the dataset."
+    table = subset.groupby('Application_Type', observed=True)['Required_Bandwidth'].mean().reset_index()
+    return table, f"Average required bandwidth for Online Gaming is {table['Required_Bandwidth'].iloc[0]:.2f} Kbps."
+
+
+def _avg_by_application(column, label):
+    def answer(df, cube=None):
+        table = _application_mean(df, column, cube)
+        return table, f"Average {label} by application type: {_format_rows(table, 'Application_Type', column)}.{_unit_note(column)}"
+    return answer
+
+
+def _max_avg_latency(df, cube=None):
+    table = _application_mean(df, 'Latency', cube)
+    top = table.iloc[0]
+    return table.head(1), f"{top['Application_Type']} has the highest average latency ({top['Latency']:.2f}).{_unit_note('Latency')}"
+
+
+def _top_latency_applications(df, cube=None):
+    table = _application_mean(df, 'Latency', cube).head(7)
+    return table, f"Applications with the highest average latency: {_format_rows(table, 'Application_Type', 'Latency')}.{_unit_note('Latency')}"
+
+
+def _by_application_stats(column, label):
+    def answer(df, cube=None):
+        if cube is not None:
+            table = cube.stats(column).drop(columns='sum').reset_index()
+        else:
+            table = df.groupby('Application_Type', observed=True)[column].describe().reset_index()
+        spread = table.sort_values('std', ascending=False).iloc[0]
+        text = (f"{label} per application type: median ranges from {table['50%'].min():.2f} to {table['50%'].max():.2f}, "
+                f"with the widest spread for {spread['Application_Type']}.{_unit_note(column)}")
+        return table, text
+    return answer
+
+
+def _distribution(column, label):
+    def answer(df, cube=None):
+        table = _describe(df, column)
+        stats = df[column]
+        text = (f"{label} ranges from {stats.min():.2f} to {stats.max():.2f}, "
+                f"with mean {stats.mean():.2f} and median {stats.median():.2f}.{_unit_note(column)}")
+        return table, text
+    return answer
+
+
+def _application_counts(df, cube=None):
+    counts = cube.counts() if cube is not None else df['Application_Type'].value_counts()
+    table = counts.reset_index()
+    table.columns = ['Application_Type', 'Count']
+    text = "Records per application type: " + ", ".join(
+        f"{row.Application_Type}: {row.Count}" for row in table.itertuples()) + "."
+    return table, text
+
+
+def _bandwidth_relationship(df, cube=None):
+    # Records with zero required bandwidth have no meaningful ratio
+    ratio = (df['Allocated_Bandwidth'] / df['Required_Bandwidth']).replace([np.inf, -np.inf], np.nan)
+    table = pd.DataFrame({
+        'Statistic': ['Correlation', 'Mean allocation ratio', 'Share over-allocated', 'Share under-allocated'],
+        'Value': [df['Required_Bandwidth'].corr(df['Allocated_Bandwidth']), ratio.mean(),
+                  (ratio > 1).mean(), (ratio < 1).mean()],
+    })
+    text = (f"Allocated and required bandwidth have a correlation of {table['Value'][0]:.2f}. "
+            f"On average {table['Value'][1]:.2f}x the required bandwidth is allocated; "
+            f"{table['Value'][2]:.0%} of records are over-allocated and {table['Value'][3]:.0%} under-allocated.")
+    return table, text
+
+
+# Keyword table for direct answers, matched like visuals.PLOT_INTENTS. A chart may stand in for a
+# loosely worded query, an answer may not: every group names the column the answer is computed
+# from, and narrower intents come before the broader ones that would also match.
+ANSWER_INTENTS = [
+    ("avg_bandwidth_online_gaming", [("average bandwidth requirement", "online gaming"),
+                                     ("average required bandwidth", "online gaming")]),
+    ("signal_strength_histogram", [("histogram", "signal strength")]),
+    ("max_avg_latency", [("maximum average latency",), ("highest average latency",)]),
+    ("top_latency_applications", [("top applications with high latency",),
+                                  ("applications using the highest latency",)]),
+    ("avg_latency_by_application", [("average latency", "application")]),
+    ("latency_by_application", [("latency distribution by application type",),
+                                ("visualize latency by application type",)]),
+    ("avg_resource_allocation_by_application", [("average resource allocation", "application")]),
+    ("resource_allocation_distribution", [("distribution of resource allocation",)]),
+    ("signal_strength_distribution", [("distribution of signal strength",)]),
+    ("signal_strength_by_application", [("visualize signal strength by application type",)]),
+    ("application_type_distribution", [("distribution of application types",),
+                                       ("visualize distribution of application types",)]),
+    ("most_common_applications", [("most commonly used application types",)]),
+    ("bandwidth_relationship", [("relationship between allocated and required bandwidth",),
+                                ("visualize the relationship between allocated bandwidth and required bandwidth",)]),
+]
+
+# Direct pandas answers for the intents in ANSWER_INTENTS
+INTENT_ANSWERS = {
+    "avg_bandwidth_online_gaming": _avg_bandwidth_online_gaming,
+    "signal_strength_histogram": _distribution('Signal_Strength', "Signal strength"),
+    "avg_latency_by_application": _avg_by_application('Latency', "latency"),
+    "max_avg_latency": _max_avg_latency,
+    "latency_by_application": _by_application_stats('Latency', "Latency"),
+    "top_latency_applications": _top_latency_applications,
+    "avg_resource_allocation_by_application": _avg_by_application('Resource_Allocation', "resource allocation (%)"),
+    "resource_allocation_distribution": _distribution('Resource_Allocation', "Resource allocation (%)"),
+    "signal_strength_distribution": _distribution('Signal_Strength', "Signal strength"),
+    "signal_strength_by_application": _by_application_stats('Signal_Strength', "Signal strength"),
+    "application_type_distribution": _application_counts,
+    "most_common_applications": _application_counts,
+    "bandwidth_relationship": _bandwidth_relationship,
+}
+
+
+def answer_query(query, df, cube=None):
+    """
+    Answers a recognized analytic query directly with pandas, without the LLM.
+
+    Parameters:
+    query (str): The user's query.
+    df (pd.DataFrame): The preprocessed dataset.
+    cube (AggregateCube): Optional precomputed per-application aggregates of df.
+
+    Returns:
+    dict: {'intent', 'table', 'summary'} for a recognized query, or None so the
+        caller can fall back to the agent.
+    """
+    intent = match_intent(query, ANSWER_INTENTS)
+    if intent not in INTENT_ANSWERS:
+        return None
+    table, summary = INTENT_ANSWERS[intent](df, cube)
+    return {'intent': intent, 'table': table, 'summary': summary}
@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it notices it was cancelled."""
+
+
+class Job:
+    """
+    A query running in the background.
+
+    The job function receives the Job itself, so it can report progress with
+    set_progress(), publish streamed output with emit() and stop early by
+    calling check_cancelled() between steps.
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = PENDING
+        self.progress = "Queued"
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._future = None
+        self._chunks = []
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def set_progress(self, message):
+        self.progress = message
+
+    def emit(self, text):
+        """Publishes a chunk of streamed output, e.g. LLM tokens, to whoever renders the job."""
+        self._chunks.append(text)
+
+    @property
+    def streamed_text(self):
+        """Everything passed to emit() so far, joined."""
+        return "".join(self._chunks)
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def wait(self, timeout=None):
+        """Blocks until the job has finished or timeout seconds have passed."""
+        if self._future is not None:
+            wait([self._future], timeout)
+
+    def cancel(self):
+        """Cancels a queued job right away, or asks a running one to stop at its next step."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.status = CANCELLED
+            self.progress = "Cancelled"
+            self.finished = time.time()
+
+
+class RateLimiter:
+    """Spaces out callers of acquire() so at most per_minute of them proceed in any minute."""
+
+    def __init__(self, per_minute=None):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class JobExecutor:
+    """Runs jobs on a thread pool and keeps them for status polling."""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            return
+        job.status = RUNNING
+        job.progress = "Running"
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = DONE
+            job.progress = "Done"
+        except JobCancelled:
+            job.status = CANCELLED
+            job.progress = "Cancelled"
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+            job.progress = f"Failed: {e}"
+        finally:
+            job.finished = time.time()
+
+    def submit(self, name, func, *args, **kwargs):
+        """
+        Starts func(job, *args, **kwargs) in the background.
+
+        Returns:
+        Job: Handle to poll for status, progress and result.
+        """
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, job_id):
+        """Drops a finished job once its result has been collected."""
+        with self._lock:
+            self._jobs.pop(job_id, None)
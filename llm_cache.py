@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def normalize_query(text):
+    """Lowercases text and collapses whitespace so trivially different queries share a key."""
+    return " ".join(text.lower().split())
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of LLM responses.
+
+    Responses are keyed on the normalized prompt or query text, the dataset
+    fingerprint, the prompt template version and the model settings. Entries
+    older than ttl_seconds are treated as misses, and once the table holds
+    more than max_entries the least recently used rows are deleted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Streamlit serves sessions from several threads, access goes through _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(kind, text, fingerprint, template_version, model_key):
+        """
+        Builds the cache key for one LLM call.
+
+        Parameters:
+        kind (str): Which call is cached, e.g. "agent" or "detailed".
+        text (str): Query or prompt text, normalized before hashing.
+        fingerprint (str): Fingerprint of the dataset the answer is about.
+        template_version (str): Version of the prompt template in use.
+        model_key (str): Model settings, see agents.llm_config_key.
+
+        Returns:
+        str: Hex digest of all the parts.
+        """
+        parts = [kind, normalize_query(text), fingerprint or "", template_version, model_key]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def get(self, key):
+        """Returns the cached response for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """Stores response under key and evicts expired and excess entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def get_or_call(self, key, call):
+        """Returns the cached response for key, or calls call() and caches its result."""
+        response = self.get(key)
+        if response is None:
+            response = call()
+            self.put(key, response)
+        return response
+
+    def stats(self):
+        """Returns hit/miss counters and the number of stored entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        """Deletes every entry and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
@@ -1,4 +1,10 @@
+import functools
+import hashlib
+import json
+import logging
 import os
+import tempfile
+import time
 import uuid
 import pandas as pd
 import streamlit as st
@@ -9,13 +15,32 @@ import plotly.graph_objects as go
 import io
 from PIL import Image
 import base64
-from preprocess import preprocess_data  # Import your preprocessing script
+from preprocess import (PREPROCESS_VERSION, STREAMING_THRESHOLD_BYTES, QoSPreprocessor, compact_dtypes,
+                        preprocess_csv_streaming, read_parquet_compact, read_qos_csv)  # Import your preprocessing script
 from dotenv import load_dotenv
-from generate_pdf import generate_pdf_report
-from visuals import generate_plot
+from generate_pdf import ReportBuilder
+from visuals import POINT_BUDGET
+from cube import AggregateCube
+from parallel_preprocess import preprocess_parallel
+from figures import FigureCache
+from cache import DataFrameCache, content_key
+from agents import AgentRegistry
+from llm_cache import ResponseCache
+from tracing import Trace, export_jsonl
+from dataset_profile import build_profile, estimate_tokens
+from jobs import CANCELLED, DONE, JobExecutor
+from history import SessionStore
+from queries import AGENT_OPTIONS, agent_prefix, query_needs_visualization, run_query_job
 
 load_dotenv()
 
+# Structured logging replaces the old print debugging; set LOG_LEVEL=DEBUG to see preprocessing details
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+logger = logging.getLogger(__name__)
+
+# Per-stage timing of uploads and queries, set TRACING=0 to disable
+TRACING_ENABLED = os.getenv("TRACING", "1") != "0"
+
 # Set up environment variable for OpenAI API key
 
 
@@ -25,36 +50,188 @@ openai_api_key = ""
 # Initialize OpenAI LLM
 llm = OpenAI(temperature=0, openai_api_key=openai_api_key)
 
-# Initialize session state for query history
-if "query_history" not in st.session_state:
-    st.session_state.query_history = []
-
-# Function to generate a detailed summary of the response
-def generate_detailed_response(agent_response, query):
-    needs_visualization = query_needs_visualization(query)
-    if needs_visualization:
-        detailed_prompt = f"""
-        Analyze the data based on the following query: {agent_response[:1000]}. 
-        Provide a clear and relevant explanation related to the dataset, and include necessary visualizations to support your findings. 
-        Make sure to include descriptions of the visualizations and explain how they address the query. 
-        Limit your explanation to 350 words for clarity and focus.
-        """
+# Size of the dataset profile put into the agent and explanation prompts
+PROFILE_TOKEN_BUDGET = int(os.getenv("PROFILE_TOKEN_BUDGET", "800"))
+
+# Persistent cache of LLM answers shared by every rerun of the script
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+# Query history of every session, kept on disk so it survives restarts
+@st.cache_resource
+def get_session_store():
+    return SessionStore()
+
+# History entries rendered per page in the sidebar and the Query History section
+HISTORY_PAGE_SIZE = 5
+
+# Traces of this session's uploads and queries, exported as JSON lines
+if "traces" not in st.session_state:
+    st.session_state.traces = []
+
+# Each session lays out its report sections once, as they are added to history
+if "report_builder" not in st.session_state:
+    st.session_state.report_builder = ReportBuilder()
+
+# Background query jobs of this session and notices about the ones that did not finish
+if "pending_jobs" not in st.session_state:
+    st.session_state.pending_jobs = []
+    st.session_state.job_messages = []
+
+# Queries run as background jobs, so the page stays responsive while the agent works
+@st.cache_resource
+def get_job_executor():
+    return JobExecutor()
+
+# Seconds between redraws of the job panel while this session has queries in flight, shorter when
+# explanations are streamed in
+JOB_POLL_SECONDS = 1.0
+STREAM_POLL_SECONDS = 0.25
+
+# Move finished jobs of this session into the query history, returns whether any job finished
+def collect_finished_jobs():
+    executor = get_job_executor()
+    finished = False
+    for job_id in list(st.session_state.pending_jobs):
+        job = executor.get(job_id)
+        if job is not None and not job.done:
+            continue
+        st.session_state.pending_jobs.remove(job_id)
+        finished = True
+        if job is None:
+            continue
+        executor.forget(job_id)
+        if job.status == DONE:
+            result = job.result
+            trace = result["trace"].to_dict() if TRACING_ENABLED else None
+            get_session_store().append(st.session_state.session_id, result["query"], result["detailed_response"],
+                                       result["fig_path"], trace)
+            st.session_state.last_result = result
+            if TRACING_ENABLED:
+                st.session_state.traces.append(result["trace"])
+                # The trace is complete once the background PNG export has added its time
+                get_figure_cache().when_exported(result["fig_path"], functools.partial(export_jsonl, result["trace"]))
+        elif job.status == CANCELLED:
+            st.session_state.job_messages.append(("warning", f"Cancelled: {job.name}"))
+        else:
+            st.session_state.job_messages.append(("error", f"Query failed: {job.name} ({job.error})"))
+    return finished
+
+# Progress of this session's queries in flight. Run as a fragment on a timer, so polling redraws only
+# this panel instead of rerunning the script (hashing the upload, loading the frame) every interval.
+def show_pending_jobs(stream_responses):
+    if collect_finished_jobs():
+        # The result and the history outside this panel have changed
+        st.rerun()
+    for job_id in st.session_state.pending_jobs:
+        job = get_job_executor().get(job_id)
+        if job is None:
+            continue
+        with st.container():
+            st.write(f"**Query**: {job.name}")
+            st.info(f"{job.progress} ({time.time() - job.submitted:.0f} s)")
+            if st.button("Cancel", key=f"cancel_{job_id}", disabled=job.cancel_requested):
+                job.cancel()
+            # Each redraw shows the explanation received so far, so the script never blocks on the job
+            streamed_text = job.streamed_text
+            if stream_responses and streamed_text:
+                st.write("**Detailed Response:**")
+                st.markdown(streamed_text)
+
+# Show one page of this session's history, newest page first. Only the entries on the page are read
+# from the store and only their images are loaded, however long the history grows.
+def show_history_page(key):
+    store = get_session_store()
+    total = store.count(st.session_state.session_id)
+    if not total:
+        return
+    pages = -(-total // HISTORY_PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (1 = newest, {pages} pages)", min_value=1, max_value=pages, value=1, key=key)
+    offset = max(total - page * HISTORY_PAGE_SIZE, 0)
+    limit = total - (page - 1) * HISTORY_PAGE_SIZE - offset
+    for entry in store.page(st.session_state.session_id, offset, limit):
+        i = entry["number"]
+        with st.expander(f"Query {i}"):
+            st.write(f"**Query:** {entry['query']}")
+            st.write(f"**Response:** {entry['response']}")
+            img = entry["fig_path"]
+            if img and os.path.exists(img):
+                st.image(img, caption=f"Visualization for Query {i}", use_column_width=True)
+
+# Show the stages of a trace as a collapsible timing table
+def show_trace(trace):
+    with st.expander(f"Timing: {trace.total_ms:.0f} ms"):
+        st.dataframe(pd.DataFrame(trace.spans), use_container_width=True)
+
+# Cache of preprocessed DataFrames shared by every rerun of the script
+@st.cache_resource
+def get_dataframe_cache():
+    return DataFrameCache()
+
+# Pandas agents reused across reruns until a different file is uploaded
+@st.cache_resource
+def get_agent_registry():
+    return AgentRegistry(create_pandas_dataframe_agent)
+
+# Rows above which plots are downsampled or binned before they are sent to the browser
+PLOT_POINT_BUDGET = int(os.getenv("PLOT_POINT_BUDGET", "0")) or POINT_BUDGET
+
+# Rendered figures and their background PNG exports
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache("plots", point_budget=PLOT_POINT_BUDGET)
+
+# Uploads larger than this are preprocessed across a process pool
+PARALLEL_THRESHOLD_BYTES = 20 * 1024 * 1024
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0")) or None
+
+# Preprocessing fitted on each fully processed upload, keyed on its file, so a later upload of the same
+# session can be scaled with it. Sessions only reuse fits of files they uploaded themselves.
+PREPROCESSOR_DIR = os.path.join(".cache", "preprocessors")
+
+def preprocessor_path(file_key):
+    return os.path.join(PREPROCESSOR_DIR, f"{file_key}.json")
+
+def load_saved_fit(path):
+    """The fit saved at path and its version string for cache keys, or (None, None) if it cannot be reused."""
+    if not path or not os.path.exists(path):
+        return None, None
+    try:
+        preprocessor = QoSPreprocessor.load(path)
+    except ValueError as e:
+        logger.warning("Saved preprocessing fit %s cannot be reused: %s", path, e)
+        return None, None
+    with open(path, "rb") as f:
+        return preprocessor, f"{PREPROCESS_VERSION}-fit-{hashlib.sha256(f.read()).hexdigest()[:16]}"
+
+def load_preprocessed(data, file_key, saved_fit=None):
+    memory_report = None
+    if saved_fit is not None:
+        # Only the cheap transform is paid, with the statistics of the saved fit
+        df = saved_fit.transform(read_qos_csv(io.BytesIO(data)))
     else:
-        detailed_prompt = f"""
-        Analyze the data based on the following query: {agent_response[:1000]}. 
-        Provide a clear and relevant explanation based on the dataset without including visualizations. 
-        Focus on delivering insights and answering the query directly, while keeping your response to 350 words to maintain brevity.
-        """
-    detailed_response = llm(detailed_prompt)
-    return detailed_response
-
-# Function to detect if a visualization is required based on the query
-def query_needs_visualization(query):
-    visualization_keywords = ["visualize", "chart", "plot", "graph", "bar", "scatter", "histogram"]
-    for keyword in visualization_keywords:
-        if keyword in query.lower():
-            return True
-    return False
+        if len(data) > STREAMING_THRESHOLD_BYTES:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                parquet_path = os.path.join(tmp_dir, "preprocessed.parquet")
+                preprocessor = preprocess_csv_streaming(io.BytesIO(data), parquet_path)
+                # Read back column by column into compact dtypes instead of loading the whole file first
+                df, memory_report = read_parquet_compact(parquet_path)
+        elif len(data) > PARALLEL_THRESHOLD_BYTES:
+            df, preprocessor = preprocess_parallel(pd.read_csv(io.BytesIO(data)), workers=PREPROCESS_WORKERS)
+        else:
+            raw = read_qos_csv(io.BytesIO(data))
+            preprocessor = QoSPreprocessor()
+            df = preprocessor.fit_transform(raw)
+        os.makedirs(PREPROCESSOR_DIR, exist_ok=True)
+        preprocessor.save(preprocessor_path(file_key))
+    if memory_report is None:
+        df, memory_report = compact_dtypes(df)
+    # Keyed on the file, a cached frame of another upload must not show this report
+    st.session_state.setdefault("memory_reports", {})[file_key] = memory_report
+    return df
 
 # Ensure the plots directory exists
 if not os.path.exists("plots"):
@@ -149,6 +326,14 @@ unsafe_allow_html=True
 
 )
 
+# Each browser session keeps its id in the URL, so a reload or an app restart finds its history again
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+
+# Results of queries that finished since the last rerun go into the history before it is shown
+collect_finished_jobs()
+
 # Sidebar with logo and button
 with st.sidebar:
     st.image(logo, use_column_width=True)
@@ -158,14 +343,25 @@ with st.sidebar:
     
 
     if st.button("Generate PDF Report"):
-        if st.session_state.query_history:
+        if get_session_store().count(st.session_state.session_id):
             output_filename = f"report_{str(uuid.uuid4())}.pdf"
-            generate_pdf_report(
-                query_history=st.session_state.query_history,
-                output_filename=output_filename,
-                plots_dir="plots"
-            )
+            report_builder = st.session_state.report_builder
+            for entry in get_session_store().page(st.session_state.session_id, offset=len(report_builder), limit=None):
+                fig_path = entry["fig_path"]
+                if fig_path:
+                    # The PNG is exported in the background, a failed export leaves the entry without its image
+                    try:
+                        get_figure_cache().wait(fig_path)
+                    except Exception as e:
+                        logger.warning("Plot export for %r failed: %s", entry["query"], e)
+                    if not os.path.exists(fig_path):
+                        fig_path = None
+                report_builder.add_entry(entry["query"], entry["response"], fig_path)
+            image_stats = report_builder.build(output_filename)
             st.success("PDF report generated successfully!")
+            if image_stats["images"]:
+                st.caption(f"Embedded {image_stats['unique_images']} unique images, "
+                           f"saving {image_stats['bytes_saved'] / 1024:.0f} KB")
 
             # Provide download link
             with open(output_filename, "rb") as file:
@@ -177,14 +373,19 @@ with st.sidebar:
                 )
         else:
             st.warning("No queries to include in the report.")
+
+    if st.session_state.traces:
+        st.download_button(
+            label="Download Timings (JSON lines)",
+            data="\n".join(json.dumps(trace.to_dict(), default=str) for trace in st.session_state.traces),
+            file_name="traces.jsonl",
+            mime="application/jsonl",
+        )
+
+    cache_stats = get_response_cache().stats()
+    st.caption(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
     
-    if st.session_state.query_history:
-        for i, (q, response, img) in enumerate(st.session_state.query_history):
-            with st.expander(f"Query {i+1}"):
-                st.write(f"**Query:** {q}")
-                st.write(f"**Response:** {response}")
-                if img:
-                    st.image(img, caption=f"Visualization for Query {i+1}", use_column_width=True)
+    show_history_page("sidebar_history_page")
 
 # Main content with headline
 st.markdown(
@@ -198,64 +399,120 @@ st.markdown(
 uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
 
 if uploaded_file:
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(uploaded_file)
-    
+    uploaded_bytes = uploaded_file.getvalue()
+
     st.write("**Data Preview:**")
-    st.dataframe(df.head(), use_container_width=True)
+    st.dataframe(pd.read_csv(io.BytesIO(uploaded_bytes), nrows=5), use_container_width=True)
+
+    saved_fit, saved_fit_version = load_saved_fit(st.session_state.get("fit_path"))
+    reuse_fit = st.sidebar.checkbox(
+        "Reuse saved preprocessing fit",
+        value=False,
+        disabled=saved_fit is None,
+        help="Scale this upload with the statistics fitted on an earlier file instead of refitting.",
+    )
+    stream_responses = st.sidebar.checkbox(
+        "Stream explanations",
+        value=True,
+        help="Show the explanation token by token as it is generated instead of all at once.",
+    )
+    reuse_fit = reuse_fit and saved_fit is not None
+    preprocess_version = saved_fit_version if reuse_fit else PREPROCESS_VERSION
+    file_key = content_key(uploaded_bytes, preprocess_version)
+
+    # A different file replaces the previous one, so its agents are no longer needed
+    previous_key = st.session_state.get("file_key")
+    if previous_key and previous_key != file_key:
+        get_agent_registry().invalidate(previous_key)
+    st.session_state.file_key = file_key
+
+    upload_trace = Trace(f"upload {uploaded_file.name}", enabled=TRACING_ENABLED)
+
+    # Preprocess the DataFrame before querying, reusing the cached result for a known file
+    with upload_trace.span("read_csv + preprocess_data", rows=None) as span:
+        fit = saved_fit if reuse_fit else None
+        df = get_dataframe_cache().get_or_compute(file_key, lambda: load_preprocessed(uploaded_bytes, file_key, fit))
+        span["rows"] = len(df)
+    if not reuse_fit:
+        # The fit of this upload is the one later uploads of this session can reuse
+        st.session_state.fit_path = preprocessor_path(file_key)
+    # Per-application aggregates are built once per file and shared by plots and direct answers
+    if st.session_state.get("cube_key") != file_key:
+        with upload_trace.span("aggregate_cube"):
+            st.session_state.cube = AggregateCube.from_frame(df)
+        st.session_state.cube_key = file_key
+    cube = st.session_state.cube
+
+    # Compact profile of the data for the prompts, also built once per file
+    if st.session_state.get("profile_key") != file_key:
+        with upload_trace.span("dataset_profile") as span:
+            st.session_state.profile = build_profile(df, cube, token_budget=PROFILE_TOKEN_BUDGET)
+            span["tokens"] = estimate_tokens(st.session_state.profile)
+        st.session_state.profile_key = file_key
+    profile = st.session_state.profile
 
-    # Preprocess the DataFrame before querying
-    df = preprocess_data(df)
     st.write("**Data after Preprocessing:**")
     st.dataframe(df.head(), use_container_width=True)
-
-    # Initialize Pandas DataFrame Agent
-    agent = create_pandas_dataframe_agent(llm, df, verbose=True, allow_dangerous_code=True, max_iterations=200, timeout=600)
+    memory_report = st.session_state.get("memory_reports", {}).get(file_key)
+    if memory_report:
+        st.caption(f"Memory: {memory_report['before_bytes'] / 1024 ** 2:.2f} MB before compaction, "
+                   f"{memory_report['after_bytes'] / 1024 ** 2:.2f} MB after")
+
+    # Reuse the Pandas DataFrame Agent built for this file on an earlier rerun
+    with upload_trace.span("agent setup"):
+        agent = get_agent_registry().get(llm, df, fingerprint=file_key, prefix=agent_prefix(profile), **AGENT_OPTIONS)
+    show_trace(upload_trace)
+    # The upload's stages are recorded once per file, later reruns only hit the caches
+    if TRACING_ENABLED and st.session_state.get("upload_trace_key") != file_key:
+        st.session_state.traces.append(upload_trace)
+        export_jsonl(upload_trace)
+        st.session_state.upload_trace_key = file_key
 
     # Ask the user for a query related to the dataset
     query = st.text_input("Enter your query for the data (e.g., 'Show the top 5 rows' or 'What are the basic statistics?'):").strip()
 
-    if query:
+    # Each new query is submitted once per file, reruns while it runs only poll its progress
+    if query and (file_key, query) != st.session_state.get("submitted_query"):
+        st.session_state.submitted_query = (file_key, query)
+        query_trace = Trace(query, enabled=TRACING_ENABLED)
+        job = get_job_executor().submit(query, run_query_job, llm, query, df, cube, agent, file_key,
+                                        get_response_cache(), get_figure_cache(), query_trace,
+                                        stream=stream_responses, profile=profile)
+        st.session_state.pending_jobs.append(job.id)
+
+    for level, message in st.session_state.job_messages:
+        getattr(st, level)(message)
+    st.session_state.job_messages = []
+
+    # The panel only polls while queries are in flight, the rerun that collects the last one stops the timer
+    poll_seconds = STREAM_POLL_SECONDS if stream_responses else JOB_POLL_SECONDS
+    st.fragment(show_pending_jobs, run_every=poll_seconds if st.session_state.pending_jobs else None)(stream_responses)
+
+    # A result for a previously uploaded file is not shown for this one
+    last_result = st.session_state.get("last_result")
+    if last_result and last_result["fingerprint"] == file_key:
         with st.container():
             st.write("**Query**:")
-            st.write(query)
-            
-            # Use Pandas Agent to handle the query
-            response = agent.run(query)
-            
-            # Generate a detailed response
-            detailed_response = generate_detailed_response(response, query)
-            
+            st.write(last_result["query"])
+
             st.write("**Detailed Response:**")
-            st.markdown(detailed_response)
+            st.markdown(last_result["detailed_response"])
+            if last_result["table"] is not None and not last_result["table"].empty:
+                st.dataframe(last_result["table"], use_container_width=True)
 
-            # If the query or response suggests a visualization, generate the relevant plot
-            if query_needs_visualization(query):
+            # If the query or response suggests a visualization, show the plot rendered alongside it
+            if query_needs_visualization(last_result["query"]):
                 st.write("**Generating Visual Based on Query:**")
-                fig_plotly = generate_plot(query, df)  # This should now return only Plotly figures
-
-                if isinstance(fig_plotly, go.Figure):  # Check if the returned value is a valid Plotly figure
-                    # Save Plotly figure as PNG
-                    fig_name = f"plot_{str(uuid.uuid4())}.png"
-                    fig_path = os.path.join("plots", fig_name)
-                    fig_plotly.write_image(fig_path)
-                    
-                    # Display Plotly chart
+                if isinstance(last_result["fig"], go.Figure):  # Check if the returned value is a valid Plotly figure
+                    # Display Plotly chart while the PNG export runs
                     st.write("**Displaying Visualization:**")
-                    st.image(fig_path, caption=f"Plotly Visualization for Query {len(st.session_state.query_history) + 1}", use_column_width=True)
-                    
-                    # Append to query history
-                    st.session_state.query_history.append((query, detailed_response, fig_path))
+                    st.plotly_chart(last_result["fig"], use_container_width=True)
+                    st.caption(f"Plotly Visualization for Query {get_session_store().count(st.session_state.session_id)}")
                 else:  # If no plot is generated
                     st.write("No visualization generated for the given query.")
-            else:
-                st.session_state.query_history.append((query, detailed_response, None))
+
+            show_trace(last_result["trace"])
     
-    if st.session_state.query_history:
+    if get_session_store().count(st.session_state.session_id):
         st.subheader("Query History")
-        for i, (q, response, img) in enumerate(st.session_state.query_history):
-            with st.expander(f"Query {i+1}"):
-                st.write(f"**Query:** {q}")
-                st.write(f"**Response:** {response}")
-                if img:
-                    st.image(img, caption=f"Visualization for Query {i+1}", use_column_width=True)
+        show_history_page("history_page")
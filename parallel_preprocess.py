@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+from pyarrow import feather
+
+from preprocess import QoSPreprocessor
+
+# Row ranges smaller than this are not worth a worker round-trip
+MIN_PARTITION_ROWS = 50_000
+# Partitions per worker, so uneven ranges still keep every core busy
+PARTITIONS_PER_WORKER = 2
+
+
+def _read_rows(path, start, stop):
+    # The Arrow file is memory mapped, so each worker only materializes its own rows
+    table = feather.read_table(path, memory_map=True)
+    return table.slice(start, stop - start).to_pandas()
+
+
+def _fit_partition(path, start, stop, prepared_path):
+    # The unit-normalized rows are kept for the transform pass, so each range is prepared once
+    preprocessor = QoSPreprocessor()
+    prepared = preprocessor._prepare(_read_rows(path, start, stop))
+    feather.write_feather(prepared.reset_index(drop=True), prepared_path, compression="uncompressed")
+    return preprocessor._partial_fit_prepared(prepared).to_dict()
+
+
+def _transform_partition(prepared_path, state, carry, output_path):
+    preprocessor = QoSPreprocessor.from_dict(state)
+    prepared = feather.read_table(prepared_path, memory_map=True).to_pandas()
+    transformed, _ = preprocessor._transform_chunk_prepared(prepared, carry)
+    feather.write_feather(transformed.reset_index(drop=True), output_path, compression="uncompressed")
+    return output_path
+
+
+def partition_bounds(n_rows, workers, min_rows=MIN_PARTITION_ROWS):
+    """Splits range(n_rows) into contiguous (start, stop) row ranges."""
+    partitions = max(1, min(workers * PARTITIONS_PER_WORKER, n_rows // max(min_rows, 1)))
+    step = -(-n_rows // partitions)
+    return [(start, min(start + step, n_rows)) for start in range(0, n_rows, step)]
+
+
+def preprocess_parallel(df, workers=None, min_rows=MIN_PARTITION_ROWS):
+    """
+    Preprocesses a raw QoS frame across a process pool.
+
+    The frame is written once to an uncompressed Arrow file that every worker
+    memory maps, so only row-range bounds and the small fitted state are
+    pickled. Workers first fit each row range independently; the fits are
+    merged in order (see QoSPreprocessor.merge), which gives the global
+    statistics and the forward-fill carry entering each range. Workers then
+    transform their ranges and write them back as Arrow files.
+
+    Parameters:
+    df (pd.DataFrame): Raw QoS rows as read from the CSV.
+    workers (int): Number of worker processes, defaults to the CPU count.
+    min_rows (int): Smallest row range handed to a worker.
+
+    Returns:
+    tuple: (preprocessed DataFrame, fitted QoSPreprocessor), equal to a
+        sequential fit and transform of the whole frame.
+    """
+    workers = workers or os.cpu_count() or 1
+    bounds = partition_bounds(len(df), workers, min_rows)
+    if workers == 1 or len(bounds) == 1:
+        preprocessor = QoSPreprocessor()
+        return preprocessor.fit_transform(df).reset_index(drop=True), preprocessor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, "input.arrow")
+        feather.write_feather(df.reset_index(drop=True), input_path, compression="uncompressed")
+
+        prepared_paths = [os.path.join(tmp_dir, f"prepared_{i}.arrow") for i in range(len(bounds))]
+        # Forked workers would inherit the locks of the Streamlit server's threads, spawned ones start clean
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            states = list(executor.map(_fit_partition, [input_path] * len(bounds), *zip(*bounds), prepared_paths))
+
+            # Merge the range fits in order, noting the carry entering each range
+            preprocessor = QoSPreprocessor()
+            carries = []
+            for state in states:
+                carries.append(preprocessor._carry)
+                preprocessor.merge(QoSPreprocessor.from_dict(state))
+
+            state = preprocessor.to_dict()
+            output_paths = [os.path.join(tmp_dir, f"part_{i}.arrow") for i in range(len(bounds))]
+            futures = [
+                executor.submit(_transform_partition, prepared_path, state, carry, output_path)
+                for prepared_path, carry, output_path in zip(prepared_paths, carries, output_paths)
+            ]
+            for future in futures:
+                future.result()
+
+        tables = [feather.read_table(path, memory_map=True) for path in output_paths]
+        result = pa.concat_tables(tables, promote_options="default").to_pandas()
+    return result, preprocessor
@@ -1,57 +1,165 @@
+import io
+import json
+import logging
+import re
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
+
+logger = logging.getLogger(__name__)
+
+STRING_DTYPE = 'string[pyarrow]'
+
+# Multiplier applied to the numeric part of a value for each unit suffix.
+# Bandwidth is normalized to Kbps, everything else keeps its own unit.
+UNIT_MULTIPLIERS = {
+    'dBm': 1,
+    'ms': 1,
+    '%': 1,
+    'Kbps': 1,
+    'Mbps': 1000,
+    'Gbps': 1000000,
+}
+
+# Columns carrying a unit suffix and the dtype they are converted to
+UNIT_COLUMNS = {
+    'Signal_Strength': 'int',
+    'Latency': 'int',
+    'Resource_Allocation': 'int',
+    'Required_Bandwidth': 'float',
+    'Allocated_Bandwidth': 'float',
+}
+
+# Columns standardized to zero mean and unit variance by preprocess_data
+SCALED_COLUMNS = ['Signal_Strength', 'Latency']
+
+# Compact dtypes for the preprocessed QoS columns. 'integer' picks the smallest
+# integer type that fits, 'string' uses Arrow-backed strings.
+COMPACT_SCHEMA = {
+    'User_ID': 'string',
+    'Application_Type': 'category',
+    'Signal_Strength': 'float32',
+    'Latency': 'float32',
+    'Resource_Allocation': 'integer',
+    'Required_Bandwidth': 'float32',
+    'Allocated_Bandwidth': 'float32',
+    'Bandwidth_Utilization_Ratio': 'float32',
+}
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Files larger than this are preprocessed out of core, chunk by chunk (see preprocess_csv_streaming)
+STREAMING_THRESHOLD_BYTES = 200 * 1024 * 1024
+
+# Categorical value counts kept for mode imputation are pruned past this size
+MAX_MODE_CANDIDATES = 10000
+# Rows of the first chunk sampled to tell identifier-like columns (e.g. User_ID) from categories
+MODE_SAMPLE_ROWS = 10000
+
+# Bump whenever preprocess_data changes its output so cached frames are rebuilt
+PREPROCESS_VERSION = "3"
+
+
+def unit_pattern(unit_multipliers):
+    """Regex splitting a value into its number and one of the known unit suffixes."""
+    units = "|".join(re.escape(unit) for unit in sorted(unit_multipliers, key=len, reverse=True))
+    return rf'^\s*(?P<number>[-+]?\d*\.?\d+)\s*(?P<unit>{units})?\s*$'
+
+
+UNIT_PATTERN = unit_pattern(UNIT_MULTIPLIERS)
+
+
+def normalize_units(df, unit_multipliers=UNIT_MULTIPLIERS, unit_columns=UNIT_COLUMNS):
+    """
+    Strips unit suffixes from the QoS columns in a single vectorized pass.
+
+    Each value is split into number and unit with one Arrow regex extraction, and
+    the unit is mapped to its multiplier through unit_multipliers. Columns that are
+    already numeric are left untouched, values that do not parse become NaN.
+
+    Parameters:
+    df (pd.DataFrame): Raw QoS data.
+    unit_multipliers (dict): Multiplier per unit suffix.
+    unit_columns (dict): Columns to convert and their target dtype.
+
+    Returns:
+    pd.DataFrame: The same frame with the unit columns converted to numbers.
+    """
+    pattern = UNIT_PATTERN if unit_multipliers is UNIT_MULTIPLIERS else unit_pattern(unit_multipliers)
+    units = pa.array(list(unit_multipliers), type=pa.string())
+    multipliers = pa.array(list(unit_multipliers.values()), type=pa.float64())
+    for column, dtype in unit_columns.items():
+        if column not in df.columns or pd.api.types.is_numeric_dtype(df[column]):
+            continue
+        # pandas' str.extract calls re per element, Arrow's extract_regex runs in C++
+        try:
+            strings = pa.array(df[column], type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            strings = pa.array(df[column].astype('string'), type=pa.string(), from_pandas=True)
+        parts = pc.extract_regex(strings, pattern)
+        numbers = pc.cast(pc.struct_field(parts, 'number'), pa.float64())
+        multiplier = pc.fill_null(pc.take(multipliers, pc.index_in(pc.struct_field(parts, 'unit'), units)), 1.0)
+        values = pd.Series(pc.multiply(numbers, multiplier).to_numpy(zero_copy_only=False),
+                           index=df.index, name=column)
+        if dtype == 'int' and values.notna().all():
+            values = values.astype('int')
+        df[column] = values
+    return df
+
+
+def read_qos_csv(source, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Reads a QoS CSV chunk by chunk, normalizing units as each chunk arrives.
+
+    Parameters:
+    source (str or file-like): Path or buffer holding the CSV.
+    chunksize (int): Number of rows parsed per chunk.
+
+    Returns:
+    pd.DataFrame: The full dataset with numeric unit columns.
+    """
+    chunks = [normalize_units(chunk) for chunk in pd.read_csv(source, chunksize=chunksize)]
+    return pd.concat(chunks, ignore_index=True)
+
+
 def preprocess_data(df):
     # Check data types and missing values before processing
-    print("\nData Types Before Processing:")
-    print(df.info())
+    if logger.isEnabledFor(logging.DEBUG):
+        info = io.StringIO()
+        df.info(buf=info)
+        logger.debug("Data types before processing:\n%s", info.getvalue())
     
     # Separate numerical and categorical columns
     numerical_features = df.select_dtypes(include=['number']).columns
     categorical_features = df.select_dtypes(include=['object']).columns
     
-    # Remove unwanted substrings and convert columns to numeric types
+    # Strip unit suffixes and convert the QoS columns to numeric types
     try:
-        print("Converting 'Signal_Strength', 'Latency', 'Resource_Allocation'")
-        df['Signal_Strength'] = df['Signal_Strength'].str.replace(' dBm', '').astype('int')
-        df['Latency'] = df['Latency'].str.replace(' ms', '').astype('int')
-        df['Resource_Allocation'] = df['Resource_Allocation'].str.replace('%', '').astype('int')
+        logger.debug("Converting unit columns: %s", ", ".join(UNIT_COLUMNS))
+        df = normalize_units(df)
     except Exception as e:
-        print(f"Error converting 'Signal_Strength', 'Latency', or 'Resource_Allocation': {e}")
+        logger.error("Error converting unit columns: %s", e)
     
-    # Print data types after conversion
-    print("\nData Types After Conversion:")
-    print(df.dtypes)
+    # Log data types after conversion
+    logger.debug("Data types after conversion:\n%s", df.dtypes)
     
     # Convert 'Timestamp' to datetime
     df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
     
-    # Convert Mbps to Kbps in bandwidth columns
-    def mbps_to_kbps(value):  
-        if 'Mbps' in value:
-            n = float(value.replace(' Mbps',''))
-            return str(n * 1000) + ' Kbps'
-        else:
-            return value
-
-    try:
-        df['Required_Bandwidth'] = df['Required_Bandwidth'].map(mbps_to_kbps)
-        df['Allocated_Bandwidth'] = df['Allocated_Bandwidth'].map(mbps_to_kbps)
-        df['Required_Bandwidth'] = df['Required_Bandwidth'].str.replace(' Kbps', '').astype('float')
-        df['Allocated_Bandwidth'] = df['Allocated_Bandwidth'].str.replace(' Kbps', '').astype('float')
-    except Exception as e:
-        print(f"Error in bandwidth conversion: {e}")
-    
-    # Print data types after bandwidth conversion
-    print("\nData Types After Bandwidth Conversion:")
-    print(df.dtypes)
-    
     # Impute missing values for numerical and categorical features **after conversion**
     numerical_features = df.select_dtypes(include=['number']).columns
     categorical_features = df.select_dtypes(include=['object']).columns
 
-    print("Numerical Features After Conversion: ", numerical_features)
-    print("Categorical Features After Conversion: ", categorical_features)
+    logger.debug("Numerical features after conversion: %s", list(numerical_features))
+    logger.debug("Categorical features after conversion: %s", list(categorical_features))
 
    # Fill missing values using forward fill
     df.fillna(method='ffill', inplace=True)
@@ -71,10 +179,485 @@ def preprocess_data(df):
     
     # Standardize numerical features
     scaler = StandardScaler()
-    df[['Signal_Strength', 'Latency']] = scaler.fit_transform(df[['Signal_Strength', 'Latency']])
+    df[SCALED_COLUMNS] = scaler.fit_transform(df[SCALED_COLUMNS])
     
     # Create a new feature: Bandwidth Utilization Ratio
     df['Bandwidth_Utilization_Ratio'] = df['Allocated_Bandwidth'] / df['Required_Bandwidth']
     
     return df
- 
\ No newline at end of file
+ 
+
+def _rewind(source):
+    # File-like sources are read once per pass
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def _forward_fill(chunk, carry):
+    """Forward fills a chunk, continuing from the last filled row of the previous chunk."""
+    filled = chunk.ffill()
+    if carry is not None:
+        filled = filled.fillna(carry)
+    return filled
+
+
+def _merge_moments(left, right):
+    """Merges (count, mean, M2) moments of two blocks (Chan et al. parallel Welford update)."""
+    n_a, mean_a, m2_a = left
+    n_b, mean_b, m2_b = right
+    n = n_a + n_b
+    if n == 0:
+        return left
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    return n, mean, m2
+
+
+def _block_moments(values):
+    values = values.dropna().to_numpy(dtype='float64')
+    if not len(values):
+        return 0, 0.0, 0.0
+    mean = values.mean()
+    return len(values), mean, float(((values - mean) ** 2).sum())
+
+
+class QoSPreprocessor:
+    """
+    Fitted, reusable version of the preprocess_data steps.
+
+    fit/partial_fit learn the unit tables, imputation values (column means and
+    modes) and scaler moments; partial_fit folds in one chunk at a time with
+    Welford/Chan moment merging, forward filling across chunk boundaries like
+    the in-memory path. transform then applies the learned state to any batch,
+    and save/load persist it as JSON so later uploads skip the fit.
+    """
+
+    def __init__(self, unit_multipliers=UNIT_MULTIPLIERS, unit_columns=UNIT_COLUMNS,
+                 scaled_columns=SCALED_COLUMNS):
+        self.unit_multipliers = dict(unit_multipliers)
+        self.unit_columns = dict(unit_columns)
+        self.scaled_columns = list(scaled_columns)
+        self.reset()
+
+    def reset(self):
+        """Forgets everything learned so far."""
+        self.n_rows = 0
+        self.columns = []
+        self.missing = set()
+        self.first_valid = {}
+        self.leading_missing = {}
+        self.moments = {column: (0, 0.0, 0.0) for column in self.unit_columns}
+        self.value_counts = {}
+        self.high_cardinality = set()
+        self._carry = None
+        return self
+
+    def _prepare(self, df):
+        df = normalize_units(df.copy(), self.unit_multipliers, self.unit_columns)
+        if 'Timestamp' in df.columns:
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'], errors='coerce')
+        return df
+
+    def partial_fit(self, df):
+        """
+        Folds the next chunk of a stream into the fitted state.
+
+        Parameters:
+        df (pd.DataFrame): Raw or unit-normalized rows following the rows seen so far.
+
+        Returns:
+        QoSPreprocessor: self
+        """
+        return self._partial_fit_prepared(self._prepare(df))
+
+    def _count_values(self, column, values):
+        if column in self.high_cardinality:
+            return
+        if column not in self.value_counts:
+            sample = values.iloc[:MODE_SAMPLE_ROWS]
+            # Identifier-like columns have no meaningful mode, counting them would cost a hash entry per row
+            if sample.nunique() > CATEGORY_MAX_RATIO * len(sample):
+                self.high_cardinality.add(column)
+                return
+        counts = values.value_counts()
+        if column in self.value_counts:
+            counts = self.value_counts[column].add(counts, fill_value=0).astype('int64')
+        if len(counts) > MAX_MODE_CANDIDATES:
+            counts = counts.nlargest(MAX_MODE_CANDIDATES // 10)
+        self.value_counts[column] = counts
+
+    def _partial_fit_prepared(self, chunk):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.leading_missing = {column: 0 for column in self.columns}
+        isna = chunk.isna()
+        self.missing.update(chunk.columns[isna.any()])
+        carry = {}
+        for column in self.columns:
+            valid = ~isna[column].to_numpy()
+            if not valid.any():
+                if column not in self.first_valid:
+                    self.leading_missing[column] += len(chunk)
+                continue
+            if column not in self.first_valid:
+                first = int(valid.argmax())
+                self.first_valid[column] = chunk[column].iat[first]
+                self.leading_missing[column] += first
+            carry[column] = chunk[column].iat[len(valid) - 1 - valid[::-1].argmax()]
+        # Only the columns that are fitted need filling, the carry takes each column's last valid value
+        fitted = [column for column in chunk.columns
+                  if column in self.moments or (chunk[column].dtype == object and column not in self.high_cardinality)]
+        filled = _forward_fill(chunk[fitted], self._carry[fitted] if self._carry is not None else None)
+        # Rows still missing after the forward fill are the leading gap, added in moments_for
+        for column in self.moments:
+            if column in filled.columns:
+                self.moments[column] = _merge_moments(self.moments[column], _block_moments(filled[column]))
+        for column in filled.select_dtypes(include=['object']).columns:
+            self._count_values(column, filled[column])
+        carry = pd.Series(carry, index=self.columns, dtype=object)
+        self._carry = carry if self._carry is None else carry.fillna(self._carry)
+        self.n_rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        """
+        Appends the state of a preprocessor fitted on the rows that follow this one's.
+
+        The leading gap of each column in other is filled with this preprocessor's
+        last valid value, exactly as partial_fit would have filled it, so fitting
+        row ranges independently and merging them in order equals one sequential fit.
+
+        Parameters:
+        other (QoSPreprocessor): Preprocessor fitted on the next row range only.
+
+        Returns:
+        QoSPreprocessor: self
+        """
+        if not other.columns:
+            return self
+        if not self.columns:
+            self.columns = list(other.columns)
+            self.leading_missing = {column: 0 for column in self.columns}
+        carry = self._carry
+        for column in self.columns:
+            lead = other.leading_missing.get(column, 0)
+            carried = carry[column] if carry is not None else None
+            if carried is not None and not pd.isna(carried):
+                # Other's leading gap is forward filled with our last value
+                if column in self.moments:
+                    self.moments[column] = _merge_moments(self.moments[column], (lead, float(carried), 0.0))
+                elif column in self.value_counts and lead:
+                    counts = self.value_counts[column]
+                    counts = counts.add(pd.Series({carried: lead}), fill_value=0).astype('int64')
+                    self.value_counts[column] = counts
+            elif column not in self.first_valid:
+                self.leading_missing[column] += lead
+                if column in other.first_valid:
+                    self.first_valid[column] = other.first_valid[column]
+        for column, moments in other.moments.items():
+            self.moments[column] = _merge_moments(self.moments.get(column, (0, 0.0, 0.0)), moments)
+        self.high_cardinality.update(other.high_cardinality)
+        for column, other_counts in other.value_counts.items():
+            if column in self.value_counts:
+                other_counts = self.value_counts[column].add(other_counts, fill_value=0).astype('int64')
+            self.value_counts[column] = other_counts
+        for column in self.high_cardinality:
+            self.value_counts.pop(column, None)
+        self.missing.update(other.missing)
+        if other._carry is not None:
+            self._carry = other._carry if carry is None else other._carry.fillna(carry)
+        self.n_rows += other.n_rows
+        return self
+
+    def fit(self, df):
+        """Learns the preprocessing state from df, discarding any previous fit."""
+        return self.reset().partial_fit(df)
+
+    def moments_for(self, column):
+        """(count, mean, M2) of a unit column after filling, including the leading gap."""
+        moments = self.moments[column]
+        if column in self.first_valid:
+            lead = (self.leading_missing[column], float(self.first_valid[column]), 0.0)
+            moments = _merge_moments(moments, lead)
+        return moments
+
+    @property
+    def means(self):
+        """Imputation value for each numeric column."""
+        return {column: self.moments_for(column)[1] for column in self.moments if self.moments_for(column)[0]}
+
+    @property
+    def modes(self):
+        """Imputation value for each categorical column."""
+        # Ties go to the smallest value, like SimpleImputer(strategy='most_frequent')
+        return {column: counts[counts == counts.max()].sort_index().index[0]
+                for column, counts in self.value_counts.items() if len(counts)}
+
+    @property
+    def scaler_mean(self):
+        return {column: self.moments_for(column)[1] for column in self.scaled_columns}
+
+    @property
+    def scaler_scale(self):
+        scale = {}
+        for column in self.scaled_columns:
+            count, _, m2 = self.moments_for(column)
+            std = (m2 / count) ** 0.5 if count else 0.0
+            # Same convention as StandardScaler: constant columns are not rescaled
+            scale[column] = std if std > 0 else 1.0
+        return scale
+
+    def _finish(self, filled):
+        scaler_mean = self.scaler_mean
+        scaler_scale = self.scaler_scale
+        for column in self.scaled_columns:
+            filled[column] = (filled[column] - scaler_mean[column]) / scaler_scale[column]
+        filled['Bandwidth_Utilization_Ratio'] = filled['Allocated_Bandwidth'] / filled['Required_Bandwidth']
+        return filled
+
+    def transform(self, df):
+        """
+        Applies the fitted state to a batch.
+
+        Gaps are forward then backward filled within the batch, as in
+        preprocess_data; whatever is still missing gets the fitted means and
+        modes, and the scaled columns use the fitted moments.
+
+        Parameters:
+        df (pd.DataFrame): Raw or unit-normalized QoS rows.
+
+        Returns:
+        pd.DataFrame: The preprocessed batch.
+        """
+        return self._transform_prepared(self._prepare(df))
+
+    def _transform_prepared(self, prepared):
+        filled = prepared.ffill().bfill()
+        filled = filled.fillna({**self.means, **self.modes})
+        return self._finish(filled)
+
+    def fit_transform(self, df):
+        """Fits on df and transforms it, preparing the frame only once."""
+        prepared = self._prepare(df)
+        return self.reset()._partial_fit_prepared(prepared)._transform_prepared(prepared)
+
+    def fit_stream(self, source, chunksize=DEFAULT_CHUNKSIZE):
+        """Fits on a CSV chunk by chunk, see partial_fit."""
+        self.reset()
+        for chunk in pd.read_csv(_rewind(source), chunksize=chunksize):
+            self.partial_fit(chunk)
+        return self
+
+    def transform_chunk(self, chunk, carry=None):
+        """
+        Transforms one row range of the data the preprocessor was fitted on.
+
+        Parameters:
+        chunk (pd.DataFrame): Raw or unit-normalized rows.
+        carry (pd.Series): Last filled row before chunk, or None for the first range.
+
+        Returns:
+        tuple: (preprocessed chunk, carry for the next range)
+        """
+        return self._transform_chunk_prepared(self._prepare(chunk), carry)
+
+    def _transform_chunk_prepared(self, prepared, carry=None):
+        filled = _forward_fill(prepared, carry)
+        carry = filled.iloc[-1]
+        # The backward fill only reaches the gap before a column's first valid value
+        filled = filled.fillna(self.first_valid)
+
+        # Columns that had gaps are float for the whole file, as in the in-memory path
+        for column in self.unit_columns:
+            if column in filled.columns and column in self.missing:
+                filled[column] = filled[column].astype('float')
+        return self._finish(filled), carry
+
+    def transform_stream(self, source, output_path, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Transforms the CSV the preprocessor was fitted on, chunk by chunk, into a Parquet file.
+
+        Unlike transform, filling continues across chunk boundaries and the leading
+        gap of each column takes its first valid value in the whole file, so the
+        output equals preprocess_data on the whole file.
+        """
+        writer = None
+        carry = None
+        try:
+            for chunk in pd.read_csv(_rewind(source), chunksize=chunksize):
+                transformed, carry = self.transform_chunk(chunk, carry)
+                table = pa.Table.from_pandas(transformed, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def to_dict(self):
+        def encode(value):
+            if isinstance(value, pd.Timestamp):
+                return {'timestamp': value.isoformat()}
+            return value.item() if hasattr(value, 'item') else value
+
+        return {
+            'version': PREPROCESS_VERSION,
+            'unit_multipliers': self.unit_multipliers,
+            'unit_columns': self.unit_columns,
+            'scaled_columns': self.scaled_columns,
+            'n_rows': self.n_rows,
+            'columns': self.columns,
+            'missing': sorted(self.missing),
+            'first_valid': {column: encode(value) for column, value in self.first_valid.items()},
+            'leading_missing': self.leading_missing,
+            'moments': {column: list(moments) for column, moments in self.moments.items()},
+            'value_counts': {column: {str(value): int(count) for value, count in counts.items()}
+                             for column, counts in self.value_counts.items()},
+            'high_cardinality': sorted(self.high_cardinality),
+            'carry': {column: encode(value) for column, value in self._carry.items()} if self._carry is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds a preprocessor from to_dict, refusing state fitted by another PREPROCESS_VERSION."""
+        if state.get('version') != PREPROCESS_VERSION:
+            raise ValueError(f"Preprocessor state has version {state.get('version')!r}, "
+                             f"expected {PREPROCESS_VERSION!r}; fit it again")
+
+        def decode(value):
+            if isinstance(value, dict) and 'timestamp' in value:
+                return pd.Timestamp(value['timestamp'])
+            return value
+
+        preprocessor = cls(state['unit_multipliers'], state['unit_columns'], state['scaled_columns'])
+        preprocessor.n_rows = state['n_rows']
+        preprocessor.columns = state['columns']
+        preprocessor.missing = set(state['missing'])
+        preprocessor.first_valid = {column: decode(value) for column, value in state['first_valid'].items()}
+        preprocessor.leading_missing = state['leading_missing']
+        preprocessor.moments = {column: tuple(moments) for column, moments in state['moments'].items()}
+        preprocessor.value_counts = {column: pd.Series(counts, dtype='int64')
+                                     for column, counts in state['value_counts'].items()}
+        preprocessor.high_cardinality = set(state.get('high_cardinality', []))
+        if state['carry'] is not None:
+            preprocessor._carry = pd.Series({column: decode(value) for column, value in state['carry'].items()})
+        return preprocessor
+
+    def save(self, path):
+        """Writes the fitted state to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a preprocessor saved with save."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def preprocess_csv_streaming(source, output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Preprocesses a CSV that does not fit in memory, in two passes over chunks.
+
+    The first pass fits a QoSPreprocessor chunk by chunk, the second fills,
+    scales and derives features chunk by chunk and appends each chunk to a
+    Parquet file. The result equals preprocess_data on the whole file.
+
+    Parameters:
+    source (str or file-like): Path or seekable buffer holding the CSV.
+    output_path (str): Parquet file to write.
+    chunksize (int): Number of rows parsed per chunk.
+
+    Returns:
+    QoSPreprocessor: The preprocessor fitted in the first pass.
+    """
+    preprocessor = QoSPreprocessor().fit_stream(source, chunksize)
+    preprocessor.transform_stream(source, output_path, chunksize)
+    return preprocessor
+
+
+def _compact_column(series, target):
+    if target == 'integer':
+        if series.isna().any():
+            return series
+        return pd.to_numeric(series, downcast='integer')
+    if target == 'string':
+        return series.astype(STRING_DTYPE)
+    return series.astype(target)
+
+
+def _default_target(series):
+    if pd.api.types.is_integer_dtype(series):
+        return 'integer'
+    if pd.api.types.is_float_dtype(series):
+        return 'float32'
+    if series.dtype == object:
+        distinct = series.nunique(dropna=True)
+        return 'category' if distinct <= CATEGORY_MAX_RATIO * max(len(series), 1) else 'string'
+    return None
+
+
+def _compact_columns(columns, schema):
+    # Compacts (name, series) pairs one at a time, so only one uncompacted column has to be held at once
+    compacted = {}
+    report = {'before_bytes': 0, 'after_bytes': 0, 'columns': {}}
+    index = None
+    for column, series in columns:
+        before = int(series.memory_usage(index=False, deep=True))
+        target = schema.get(column) or _default_target(series)
+        if target is not None:
+            try:
+                series = _compact_column(series, target)
+            except (TypeError, ValueError) as e:
+                logger.error("Error compacting '%s' to %s: %s", column, target, e)
+        after = int(series.memory_usage(index=False, deep=True))
+        compacted[column] = series
+        index = series.index
+        report['columns'][column] = {'dtype': str(series.dtype), 'before_bytes': before, 'after_bytes': after}
+        report['before_bytes'] += before
+        report['after_bytes'] += after
+    compacted = pd.DataFrame(compacted, index=index)
+    index_bytes = int(compacted.index.memory_usage(deep=True))
+    report['before_bytes'] += index_bytes
+    report['after_bytes'] += index_bytes
+    logger.info("Memory usage: %.2f MB -> %.2f MB", report['before_bytes'] / 1024 ** 2, report['after_bytes'] / 1024 ** 2)
+    return compacted, report
+
+
+def compact_dtypes(df, schema=COMPACT_SCHEMA):
+    """
+    Downcasts the preprocessed QoS frame to memory-lean dtypes.
+
+    Columns listed in schema get their target dtype, other columns get a
+    default by kind: smallest-fit integers, float32, and categoricals or
+    Arrow-backed strings for text depending on cardinality.
+
+    Parameters:
+    df (pd.DataFrame): The preprocessed dataset.
+    schema (dict): Target dtype per column.
+
+    Returns:
+    tuple: (compacted DataFrame, report dict with memory before and after in bytes)
+    """
+    return _compact_columns(df.items(), schema)
+
+
+def read_parquet_compact(path, schema=COMPACT_SCHEMA):
+    """
+    Reads a Parquet file written by transform_stream straight into compact dtypes.
+
+    Columns are read and compacted one at a time, so the uncompacted frame is
+    never held in memory as a whole. The result equals compact_dtypes on
+    pd.read_parquet(path).
+
+    Parameters:
+    path (str): Parquet file to read.
+    schema (dict): Target dtype per column.
+
+    Returns:
+    tuple: (compacted DataFrame, report dict with memory before and after in bytes)
+    """
+    names = pq.read_schema(path).names
+    return _compact_columns(((name, pd.read_parquet(path, columns=[name])[name]) for name in names), schema)
@@ -0,0 +1,161 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import plotly.graph_objects as go
+
+from agents import llm_config_key
+from intents import answer_query
+
+# Query pipeline shared by the Streamlit app and the batch CLI. Nothing here imports
+# Streamlit, every cache and model is passed in by the caller.
+
+# Bump when the agent setup or the detailed prompt below changes, so cached answers are not reused
+AGENT_PROMPT_VERSION = "2"
+DETAILED_PROMPT_VERSION = "2"
+
+# The pandas agent's own prefix, followed by the profile so simple questions need no exploratory tool calls
+AGENT_PREFIX = """
+You are working with a pandas dataframe in Python. The name of the dataframe is `df`.
+Here is a profile of `df`. Answer from it directly when it is enough, and use the tools only for what it does not cover.
+
+{profile}
+
+You should use the tools below to answer the question posed of you:"""
+
+# Options every pandas agent is built with
+AGENT_OPTIONS = dict(verbose=True, allow_dangerous_code=True, max_iterations=200, timeout=600)
+
+# Agent prefix for a dataset profile. The prefix becomes a prompt template, so braces in category names are escaped.
+def agent_prefix(profile):
+    return AGENT_PREFIX.format(profile=profile.replace("{", "{{").replace("}", "}}"))
+
+# Function to detect if a visualization is required based on the query
+def query_needs_visualization(query):
+    visualization_keywords = ["visualize", "chart", "plot", "graph", "bar", "scatter", "histogram"]
+    for keyword in visualization_keywords:
+        if keyword in query.lower():
+            return True
+    return False
+
+# Record the tokens and LLM round-trips of the calls made inside a span. Only OpenAI models report
+# usage, for other models (FakeLLM) or without langchain_community installed the span is left as is.
+@contextmanager
+def llm_usage(span, llm):
+    if "openai" not in type(llm).__module__:
+        yield
+        return
+    try:
+        from langchain_community.callbacks import get_openai_callback
+    except ImportError:
+        yield
+        return
+    with get_openai_callback() as callback:
+        yield
+    span["llm_calls"] = callback.successful_requests
+    span["tokens"] = callback.total_tokens
+
+# Stream a completion, passing each chunk to on_token as it arrives. A cancelled job stops between chunks.
+def stream_completion(llm, prompt, on_token, job=None):
+    chunks = []
+    for chunk in llm.stream(prompt):
+        if job is not None:
+            job.check_cancelled()
+        chunks.append(chunk)
+        on_token(chunk)
+    return "".join(chunks)
+
+# Function to generate a detailed summary of the response, streamed to on_token when it is given
+def generate_detailed_response(llm, agent_response, query, cache, fingerprint=None, on_token=None, profile=None,
+                               job=None):
+    needs_visualization = query_needs_visualization(query)
+    # Ground the explanation in the dataset profile instead of the truncated agent output alone
+    context = f"Dataset profile:\n{profile}\n" if profile else ""
+    if needs_visualization:
+        detailed_prompt = f"""
+        {context}
+        Analyze the data based on the following query: {agent_response[:1000]}. 
+        Provide a clear and relevant explanation related to the dataset, and include necessary visualizations to support your findings. 
+        Make sure to include descriptions of the visualizations and explain how they address the query. 
+        Limit your explanation to 350 words for clarity and focus.
+        """
+    else:
+        detailed_prompt = f"""
+        {context}
+        Analyze the data based on the following query: {agent_response[:1000]}. 
+        Provide a clear and relevant explanation based on the dataset without including visualizations. 
+        Focus on delivering insights and answering the query directly, while keeping your response to 350 words to maintain brevity.
+        """
+    key = cache.make_key("detailed", detailed_prompt, fingerprint, DETAILED_PROMPT_VERSION, llm_config_key(llm))
+    if on_token is None:
+        return cache.get_or_call(key, lambda: llm(detailed_prompt))
+    # A cached explanation is shown at once, a fresh one token by token
+    detailed_response = cache.get(key)
+    if detailed_response is None:
+        detailed_response = stream_completion(llm, detailed_prompt, on_token, job)
+        cache.put(key, detailed_response)
+    else:
+        on_token(detailed_response)
+    return detailed_response
+
+# Run the agent on a query, reusing the answer for the same query on the same data
+def run_agent(llm, agent, query, fingerprint, cache):
+    key = cache.make_key("agent", query, fingerprint, AGENT_PROMPT_VERSION, llm_config_key(llm))
+    return cache.get_or_call(key, lambda: agent.run(query))
+
+# Pipeline of one query, run as a job (see jobs.JobExecutor): a direct answer or the agent plus
+# an explanation, with the chart rendered alongside.
+def run_query_job(job, llm, query, df, cube, agent, fingerprint, response_cache, figure_cache, trace, stream=False,
+                  profile=None):
+    with ThreadPoolExecutor(max_workers=1) as plot_executor:
+        # The chart does not depend on the answer, so it renders while the LLM calls run
+        figure_future = None
+        if query_needs_visualization(query):
+            def record_export(seconds):
+                trace.add("write_image (background)", wall_ms=seconds * 1000)
+            def render():
+                with trace.span("generate_plot"):
+                    # The PNG export finishes in the background, its time is added to this trace when it does
+                    return figure_cache.get_figure(query, df, fingerprint, cube, on_exported=record_export)
+            figure_future = plot_executor.submit(render)
+
+        # Answer recognized analytic queries directly, only fall back to the agent otherwise
+        with trace.span("direct_answer"):
+            direct_answer = answer_query(query, df, cube)
+        if direct_answer:
+            detailed_response = direct_answer['summary']
+            if stream:
+                job.emit(detailed_response)
+        else:
+            # Use Pandas Agent to handle the query
+            job.set_progress("Running the agent")
+            with trace.span("agent.run") as span, llm_usage(span, llm):
+                response = run_agent(llm, agent, query, fingerprint, response_cache)
+            job.check_cancelled()
+
+            # Generate a detailed response
+            job.set_progress("Writing the explanation")
+            with trace.span("llm.detailed_response") as span, llm_usage(span, llm):
+                started = time.perf_counter()
+                def emit_token(text):
+                    # Time to first token is what the user waits before the answer starts to appear
+                    span.setdefault("first_token_ms", (time.perf_counter() - started) * 1000)
+                    job.emit(text)
+                on_token = emit_token if stream else None
+                detailed_response = generate_detailed_response(llm, response, query, response_cache, fingerprint,
+                                                               on_token, profile, job)
+
+        fig, fig_path = None, None
+        if figure_future is not None:
+            job.set_progress("Rendering the visualization")
+            fig, fig_path = figure_future.result()
+
+    return {
+        "query": query,
+        "fingerprint": fingerprint,
+        "detailed_response": detailed_response,
+        "table": direct_answer['table'] if direct_answer else None,
+        "fig": fig,
+        "fig_path": fig_path if isinstance(fig, go.Figure) else None,
+        "trace": trace,
+    }
@@ -0,0 +1,29 @@
+import json
+import os
+
+from batch import run_batch
+from jobs import DONE
+
+QOS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Quality of Service 5G.csv")
+
+QUERIES = [
+    "What is the average latency by application type?",
+    "Which users have the weakest signal?",
+    "Plot a bar chart of average latency by application",
+]
+
+
+def test_fake_llm_batch_runs_offline(tmp_path):
+    report_path = str(tmp_path / "report.pdf")
+    manifest_path = str(tmp_path / "results.json")
+    manifest = run_batch(QOS_CSV, QUERIES, report_path, manifest_path, workers=2, per_minute=None,
+                         plots_dir=str(tmp_path / "plots"), fake_llm=True,
+                         cache_path=str(tmp_path / "llm_cache.sqlite"))
+
+    assert [entry['query'] for entry in manifest['queries']] == QUERIES
+    assert [entry['status'] for entry in manifest['queries']] == [DONE] * len(QUERIES)
+    assert all(entry['response'] for entry in manifest['queries'])
+    assert manifest['rows'] == 400
+    assert os.path.exists(report_path)
+    with open(manifest_path) as f:
+        assert json.load(f)['queries'][0]['query'] == QUERIES[0]
@@ -0,0 +1,41 @@
+import os
+import time
+
+import pandas as pd
+
+from cache import DataFrameCache
+
+
+def frame(rows):
+    return pd.DataFrame({'Latency': range(rows), 'Application_Type': ['Video_Call'] * rows})
+
+
+def feather_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.feather'))
+
+
+def test_hit_returns_the_cached_frame_without_copying(tmp_path):
+    cache = DataFrameCache(str(tmp_path))
+    df = cache.get_or_compute('a', lambda: frame(10))
+    assert cache.get('a') is df
+
+
+def test_evicted_frame_is_reloaded_from_disk(tmp_path):
+    cache = DataFrameCache(str(tmp_path), max_bytes=0)
+    cache.put('a', frame(10))
+    pd.testing.assert_frame_equal(cache.get('a'), frame(10))
+
+
+def test_disk_is_trimmed_least_recently_used_first(tmp_path):
+    cache = DataFrameCache(str(tmp_path))
+    cache.put('a', frame(1000))
+    size = os.path.getsize(tmp_path / 'a.feather')
+    cache.max_disk_bytes = 2 * size
+    time.sleep(0.01)
+    cache.put('b', frame(1000))
+    time.sleep(0.01)
+    # Reading a marks it as used, so b is the oldest when c is added
+    cache.get('a')
+    time.sleep(0.01)
+    cache.put('c', frame(1000))
+    assert feather_files(tmp_path) == ['a.feather', 'c.feather']
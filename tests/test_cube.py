@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_qos_chunk
+from cube import AggregateCube
+from preprocess import QoSPreprocessor, compact_dtypes
+
+STATS = ['count', 'sum', 'mean', 'std', 'min', 'max']
+
+
+@pytest.fixture(scope="module")
+def qos_frame():
+    # Compacted like an upload, so Application_Type is categorical
+    df, _ = compact_dtypes(QoSPreprocessor().fit_transform(generate_qos_chunk(3000, missing_rate=0.05, seed=11)))
+    return df
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+@pytest.mark.parametrize("time_bucket", [None, "1h"])
+def test_update_in_parts_equals_from_frame(qos_frame, time_bucket):
+    whole = AggregateCube.from_frame(qos_frame, time_bucket=time_bucket)
+    parts = AggregateCube(time_bucket=time_bucket)
+    parts.update(qos_frame.iloc[:1200])
+    parts.update(qos_frame.iloc[1200:])
+
+    assert parts.rows == whole.rows == len(qos_frame)
+    pd.testing.assert_series_equal(parts.counts(), whole.counts())
+    for column in ['Latency', 'Signal_Strength']:
+        pd.testing.assert_frame_equal(parts.stats(column)[STATS], whole.stats(column)[STATS])
+        pd.testing.assert_series_equal(parts.mean(column), whole.mean(column))
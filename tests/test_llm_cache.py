@@ -0,0 +1,85 @@
+import pytest
+
+import llm_cache
+from agents import llm_config_key
+from fake_llm import FakeLLM
+from llm_cache import ResponseCache
+from queries import generate_detailed_response
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "llm.sqlite"))
+
+
+def key(text="What is the average latency?", fingerprint="fp", version="1", llm=None):
+    return ResponseCache.make_key("agent", text, fingerprint, version, llm_config_key(llm or FakeLLM()))
+
+
+def test_hits_and_misses_are_counted(cache):
+    llm = FakeLLM(default="42 ms")
+    assert cache.get_or_call(key(), lambda: llm("q")) == "42 ms"
+    assert cache.get_or_call(key(), lambda: llm("q")) == "42 ms"
+    assert len(llm.calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_detailed_response_is_served_from_the_cache(cache):
+    llm = FakeLLM(default="Latency is highest for video calls.")
+    first = generate_detailed_response(llm, "Video_Call: 80 ms", "Which app is slowest?", cache, "fp")
+    second = generate_detailed_response(llm, "Video_Call: 80 ms", "Which app is slowest?", cache, "fp")
+    assert first == second == "Latency is highest for video calls."
+    assert len(llm.calls) == 1
+
+
+def test_entries_expire_after_the_ttl(clock, tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"), ttl_seconds=60)
+    cache.put(key(), "old")
+    clock.now += 59
+    assert cache.get(key()) == "old"
+    clock.now += 2
+    assert cache.get(key()) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(clock, tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    for text in ("a", "b"):
+        cache.put(key(text), text)
+        clock.now += 1
+    cache.get(key("a"))
+    clock.now += 1
+    cache.put(key("c"), "c")
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == "a"
+    assert cache.get(key("c")) == "c"
+    assert cache.stats()["entries"] == 2
+
+
+def test_queries_differing_in_case_and_spacing_share_a_key():
+    assert key("What is the  average Latency?") == key()
+
+
+@pytest.mark.parametrize("changed", [
+    key(fingerprint="other"),
+    key(version="2"),
+    key(llm=FakeLLM(model_name="other-model")),
+    key(llm=FakeLLM(temperature=0.7)),
+])
+def test_key_changes_with_fingerprint_template_and_model(changed):
+    assert changed != key()
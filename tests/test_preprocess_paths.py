@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch
+from benchmarks.synthetic import generate_qos_chunk
+from cache import content_key
+from parallel_preprocess import preprocess_parallel
+from preprocess import compact_dtypes, preprocess_csv_streaming, preprocess_data, read_parquet_compact, read_qos_csv
+
+ROWS = 5000
+
+
+@pytest.fixture
+def qos_csv():
+    raw = generate_qos_chunk(ROWS, missing_rate=0.05, seed=7)
+    # Leading gaps are what the chunked paths have to carry between chunks
+    raw.iloc[:120, 2:] = np.nan
+    raw.iloc[:1500, raw.columns.get_loc('Signal_Strength')] = np.nan
+    buffer = io.BytesIO()
+    raw.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def expected(data):
+    return preprocess_data(read_qos_csv(io.BytesIO(data)))
+
+
+def test_streaming_matches_preprocess_data(qos_csv, tmp_path):
+    parquet_path = str(tmp_path / "out.parquet")
+    preprocess_csv_streaming(io.BytesIO(qos_csv), parquet_path, chunksize=700)
+    pd.testing.assert_frame_equal(pd.read_parquet(parquet_path), expected(qos_csv), check_dtype=False)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_parallel_matches_preprocess_data(qos_csv, workers):
+    df, _ = preprocess_parallel(pd.read_csv(io.BytesIO(qos_csv)), workers=workers, min_rows=1000)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected(qos_csv), check_dtype=False)
+
+
+def test_read_parquet_compact_matches_compact_dtypes(qos_csv, tmp_path):
+    parquet_path = str(tmp_path / "out.parquet")
+    preprocess_csv_streaming(io.BytesIO(qos_csv), parquet_path, chunksize=700)
+    df, report = read_parquet_compact(parquet_path)
+    compacted, compacted_report = compact_dtypes(pd.read_parquet(parquet_path))
+    pd.testing.assert_frame_equal(df, compacted)
+    assert report == compacted_report
+
+
+def test_batch_load_dataset_streams_large_files(qos_csv, tmp_path, monkeypatch):
+    csv_path = tmp_path / "qos.csv"
+    csv_path.write_bytes(qos_csv)
+    in_memory, fingerprint = batch.load_dataset(str(csv_path))
+    monkeypatch.setattr(batch, "STREAMING_THRESHOLD_BYTES", 0)
+    streamed, streamed_fingerprint = batch.load_dataset(str(csv_path))
+    pd.testing.assert_frame_equal(streamed, in_memory)
+    assert streamed_fingerprint == fingerprint == content_key(qos_csv)
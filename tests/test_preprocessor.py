@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_qos_chunk
+from preprocess import PREPROCESS_VERSION, QoSPreprocessor, preprocess_data
+
+
+@pytest.fixture(scope="module")
+def raw():
+    raw = generate_qos_chunk(4000, missing_rate=0.05, seed=13)
+    raw.iloc[:50, 2:] = np.nan
+    return raw
+
+
+def fit_in_chunks(raw, size):
+    preprocessor = QoSPreprocessor()
+    for start in range(0, len(raw), size):
+        preprocessor.partial_fit(raw.iloc[start:start + size])
+    return preprocessor
+
+
+def test_fit_transform_matches_preprocess_data(raw):
+    expected = preprocess_data(raw.copy())
+    pd.testing.assert_frame_equal(QoSPreprocessor().fit_transform(raw), expected, check_dtype=False)
+
+
+def test_partial_fit_in_chunks_equals_fit(raw):
+    whole = QoSPreprocessor().fit(raw)
+    chunked = fit_in_chunks(raw, 700)
+    assert chunked.n_rows == whole.n_rows == len(raw)
+    assert chunked.modes == whole.modes
+    assert chunked.means == pytest.approx(whole.means)
+    pd.testing.assert_frame_equal(chunked.transform(raw), whole.transform(raw))
+
+
+def test_identifier_columns_are_not_counted(raw):
+    preprocessor = QoSPreprocessor().fit(raw)
+    assert 'User_ID' in preprocessor.high_cardinality
+    assert 'User_ID' not in preprocessor.value_counts
+    assert 'Application_Type' in preprocessor.modes
+
+
+def test_saved_fit_transforms_new_data_on_the_same_scale(raw, tmp_path):
+    path = str(tmp_path / "fit.json")
+    preprocessor = QoSPreprocessor().fit(raw)
+    preprocessor.save(path)
+    loaded = QoSPreprocessor.load(path)
+
+    new = generate_qos_chunk(500, missing_rate=0.05, seed=14)
+    pd.testing.assert_frame_equal(loaded.transform(new), preprocessor.transform(new))
+    # Scaled with the saved statistics, not refitted on the new rows
+    assert not loaded.transform(new).equals(QoSPreprocessor().fit_transform(new))
+
+
+def test_loaded_fit_keeps_streaming_state(raw, tmp_path):
+    path = str(tmp_path / "fit.json")
+    fit_in_chunks(raw.iloc[:2000], 500).save(path)
+    resumed = QoSPreprocessor.load(path).partial_fit(raw.iloc[2000:])
+    assert resumed.means == pytest.approx(QoSPreprocessor().fit(raw).means)
+
+
+def test_fit_from_another_version_is_rejected(raw, tmp_path):
+    path = tmp_path / "fit.json"
+    QoSPreprocessor().fit(raw).save(str(path))
+    state = json.loads(path.read_text())
+    state['version'] = f"{PREPROCESS_VERSION}-old"
+    path.write_text(json.dumps(state))
+    with pytest.raises(ValueError, match="version"):
+        QoSPreprocessor.load(str(path))
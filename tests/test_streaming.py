@@ -0,0 +1,71 @@
+import pytest
+
+from fake_llm import FakeLLM
+from jobs import Job, JobCancelled
+from llm_cache import ResponseCache
+from queries import generate_detailed_response, stream_completion
+
+ANSWER = "Video calls have the highest average latency, followed by streaming."
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "llm.sqlite"))
+
+
+class Recorder:
+    """on_token callback that forwards chunks to a job and keeps them."""
+
+    def __init__(self, job):
+        self.job = job
+        self.chunks = []
+
+    def __call__(self, text):
+        self.chunks.append(text)
+        self.job.emit(text)
+
+
+def detailed(llm, cache, on_token, job=None):
+    return generate_detailed_response(llm, "Video_Call: 80 ms", "Which app is slowest?", cache, "fp",
+                                      on_token=on_token, job=job)
+
+
+def test_streamed_chunks_join_to_the_cached_response(cache):
+    job = Job("Which app is slowest?")
+    recorder = Recorder(job)
+    response = detailed(FakeLLM(default=ANSWER), cache, recorder, job)
+    assert len(recorder.chunks) > 1
+    assert "".join(recorder.chunks) == job.streamed_text == response == ANSWER
+    assert cache.stats()["entries"] == 1
+
+
+def test_cached_response_is_emitted_once(cache):
+    llm = FakeLLM(default=ANSWER)
+    detailed(llm, cache, Job("first").emit)
+    job = Job("second")
+    recorder = Recorder(job)
+    assert detailed(llm, cache, recorder, job) == ANSWER
+    assert recorder.chunks == [ANSWER]
+    assert len(llm.calls) == 1
+
+
+def test_cancelling_stops_between_chunks(cache):
+    job = Job("Which app is slowest?")
+    recorder = Recorder(job)
+
+    def on_token(text):
+        recorder(text)
+        if len(recorder.chunks) == 2:
+            job.cancel()
+
+    with pytest.raises(JobCancelled):
+        detailed(FakeLLM(default=ANSWER), cache, on_token, job)
+    assert len(recorder.chunks) == 2
+    # A cancelled explanation is not cached
+    assert cache.stats()["entries"] == 0
+
+
+def test_stream_completion_without_a_job():
+    chunks = []
+    assert stream_completion(FakeLLM(default=ANSWER), "prompt", chunks.append) == ANSWER
+    assert "".join(chunks) == ANSWER
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module, RSS is then not reported
+    resource = None
+
+DEFAULT_TRACE_PATH = os.path.join(".cache", "traces.jsonl")
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    return peak // 1024 if os.uname().sysname == "Darwin" else peak
+
+
+class Trace:
+    """
+    Per-query record of timed stages.
+
+    Each stage is wrapped in span(), which records wall time and the growth of
+    peak RSS. The span yields a dict the caller can add attributes to, such as
+    token counts and LLM round-trips. A disabled trace records nothing.
+    """
+
+    def __init__(self, name, enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        record = {"name": name, **attributes}
+        if not self.enabled:
+            yield record
+            return
+        rss_before = peak_rss_kb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall_ms"] = (time.perf_counter() - start) * 1000
+            rss_after = peak_rss_kb()
+            if rss_before is not None:
+                record["peak_rss_delta_kb"] = rss_after - rss_before
+            with self._lock:
+                self.spans.append(record)
+
+    def add(self, name, **attributes):
+        """Records a stage measured elsewhere, e.g. on a background thread."""
+        if self.enabled:
+            with self._lock:
+                self.spans.append({"name": name, **attributes})
+
+    @property
+    def total_ms(self):
+        return sum(span.get("wall_ms", 0) for span in self.spans)
+
+    def to_dict(self):
+        return {"trace": self.name, "started": self.started, "total_ms": self.total_ms, "spans": list(self.spans)}
+
+
+def export_jsonl(trace, path=DEFAULT_TRACE_PATH):
+    """Appends a trace to a JSON lines file."""
+    if not trace.enabled:
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(trace.to_dict(), default=str) + "\n")
@@ -1,111 +1,263 @@
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-def generate_plot(query, df):
+# Plotly template every figure is drawn with
+PLOT_TEMPLATE = "plotly"
+
+# Large-data mode. Scatters with more than WEBGL_THRESHOLD points are drawn with
+# WebGL (Scattergl), and with more than the point budget they are downsampled.
+# Histograms and box plots of frames with more rows than the point budget are
+# binned / summarized with NumPy so only the aggregates are sent to the browser.
+WEBGL_THRESHOLD = 10_000
+POINT_BUDGET = 100_000
+# Cells per axis of the 2-D histogram that replaces an over-budget numeric scatter
+DENSITY_GRID_BINS = 200
+# Bins of server-side histograms when the chart does not ask for a number
+DEFAULT_HISTOGRAM_BINS = 50
+
+# Keyword table mapping queries to plot intents, checked in order.
+# An intent matches when every phrase of any one of its groups is in the query.
+PLOT_INTENTS = [
+    ("avg_bandwidth_online_gaming", [("average bandwidth requirement", "online gaming"),
+                                     ("plot a bar chart of the average bandwidth requirement for online gaming",)]),
+    ("signal_strength_histogram", [("histogram",)]),
+    ("avg_latency_by_application", [("average latency", "application"),
+                                    ("applications using the highest latency",)]),
+    ("max_avg_latency", [("maximum average latency",)]),
+    ("latency_by_application", [("latency distribution by application type",),
+                                ("visualize latency by application type",)]),
+    ("top_latency_applications", [("top applications with high latency",),
+                                  ("applications using the highest latency",)]),
+    ("avg_resource_allocation_by_application", [("average resource allocation", "application")]),
+    ("resource_allocation_distribution", [("distribution of resource allocation",)]),
+    ("signal_strength_distribution", [("distribution of signal strength",)]),
+    ("signal_strength_by_application", [("visualize signal strength by application type",)]),
+    ("application_type_distribution", [("distribution of application types",),
+                                       ("visualize distribution of application types",)]),
+    ("most_common_applications", [("most commonly used application types",)]),
+    ("bandwidth_relationship", [("relationship between allocated and required bandwidth",),
+                                ("visualize the relationship between allocated bandwidth and required bandwidth",)]),
+]
+
+def match_intent(query, intents=PLOT_INTENTS):
+    """
+    Finds the plot intent a query asks for.
+
+    Parameters:
+    query (str): The user's query.
+    intents (list): Keyword table to match against, PLOT_INTENTS by default.
+
+    Returns:
+    str: Name of the first matching intent in the table, or None.
+    """
+    query = query.lower()
+    for intent, phrase_groups in intents:
+        if any(all(phrase in query for phrase in group) for group in phrase_groups):
+            return intent
+    return None
+
+def _application_mean(df, column, cube=None):
+    """Mean of column per Application_Type, read from the aggregate cube when one is given."""
+    if cube is not None:
+        return cube.mean(column)
+    return df.groupby('Application_Type', observed=True)[column].mean()
+
+def _application_counts(df, cube=None):
+    """Rows per Application_Type, most frequent first."""
+    if cube is not None:
+        return cube.counts()
+    return df['Application_Type'].value_counts()
+
+def _histogram_figure(values, title, nbins=None):
+    """Histogram with bins counted by NumPy, drawn as touching bars."""
+    values = pd.Series(values).dropna().to_numpy()
+    bins = nbins or DEFAULT_HISTOGRAM_BINS
+    if nbins is None and np.issubdtype(values.dtype, np.integer) and len(values):
+        # Integer columns with a small range get one bin per value, like Plotly's own binning
+        low, high = int(values.min()), int(values.max())
+        if high - low < DEFAULT_HISTOGRAM_BINS:
+            bins = np.arange(low, high + 2) - 0.5
+    counts, edges = np.histogram(values, bins=bins)
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                           marker_color=px.colors.sequential.Viridis[0]))
+    fig.update_layout(title=title, bargap=0, yaxis_title="count")
+    return fig
+
+def _box_figure(df, x, y, title):
+    """Box plot with quartiles and whiskers computed per group, without shipping the rows."""
+    groups = df[[x, y]].dropna().groupby(x, observed=True)[y]
+    stats = groups.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    iqr = stats['q3'] - stats['q1']
+    values = df[[x, y]].dropna()
+    low = values[x].map(stats['q1'] - 1.5 * iqr).astype(float)
+    high = values[x].map(stats['q3'] + 1.5 * iqr).astype(float)
+    # Whiskers end at the most extreme values within 1.5 IQR of the box, as in px.box
+    inside = values[y].where((values[y] >= low) & (values[y] <= high))
+    fences = inside.groupby(values[x], observed=True).agg(['min', 'max'])
+    fig = go.Figure(go.Box(x=stats.index.astype(str), q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+                           lowerfence=fences['min'].reindex(stats.index), upperfence=fences['max'].reindex(stats.index),
+                           marker_color=px.colors.sequential.Viridis[0]))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+def _density_figure(df, x, y, title, bins=DENSITY_GRID_BINS):
+    """Scatter of the occupied cells of a 2-D histogram, colored by how many rows fall in each."""
+    values = df[[x, y]].dropna()
+    counts, x_edges, y_edges = np.histogram2d(values[x], values[y], bins=bins)
+    ix, iy = np.nonzero(counts)
+    fig = go.Figure(go.Scattergl(
+        x=(x_edges[ix] + x_edges[ix + 1]) / 2, y=(y_edges[iy] + y_edges[iy + 1]) / 2, mode='markers',
+        marker=dict(color=np.log10(counts[ix, iy]), colorscale='Viridis', showscale=True,
+                    colorbar=dict(title='log10 rows')),
+        customdata=counts[ix, iy], hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>rows=%{{customdata}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+def _scatter_figure(df, x, y, title, point_budget):
+    """
+    Scatter that stays responsive on large data.
+
+    Small frames go to px.scatter unchanged. Past WEBGL_THRESHOLD points the
+    trace is drawn with WebGL, and past point_budget a numeric x is aggregated
+    into a 2-D histogram while a categorical x is uniformly sampled, which
+    keeps the relative density of every group.
+    """
+    if len(df) <= WEBGL_THRESHOLD:
+        return px.scatter(df, x=x, y=y, title=title, color_discrete_sequence=px.colors.sequential.Viridis)
+    if len(df) > point_budget:
+        if pd.api.types.is_numeric_dtype(df[x]):
+            return _density_figure(df, x, y, title)
+        df = df.sample(n=point_budget, random_state=0)
+    fig = go.Figure(go.Scattergl(x=df[x], y=df[y], mode='markers',
+                                 marker=dict(color=px.colors.sequential.Viridis[0], size=4)))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+def generate_plot(query, df, cube=None, point_budget=POINT_BUDGET):
     """
     Dynamically generates a relevant Plotly plot based on the user's query.
     
     Parameters:
     query (str): The user's query.
     df (pd.DataFrame): The dataset.
+    cube (AggregateCube): Optional precomputed per-application aggregates of df.
+    point_budget (int): Rows above which charts are downsampled or aggregated on the server.
     
     Returns:
     fig: Plotly figure object or a message if no plot is found.
     """
-    query = query.lower()  # Normalize query for easier matching
+    intent = match_intent(query)
     # Set default template for color plots
-    px.defaults.template = "plotly"
+    px.defaults.template = PLOT_TEMPLATE
+    large = len(df) > point_budget
 
     ### Average Bandwidth Requirement Queries ###
-    if ("average bandwidth requirement" in query and "online gaming" in query) or \
-       ("plot a bar chart of the average bandwidth requirement for online gaming" in query):
-        avg_bandwidth = df[df['Application_Type'] == 'Online Gaming'].groupby('Application_Type')['Required_Bandwidth'].mean().reset_index()
+    if intent == "avg_bandwidth_online_gaming":
+        # Application types are stored with underscores, e.g. 'Online_Gaming'
+        names = df['Application_Type'].astype(str).str.replace('_', ' ').str.lower()
+        avg_bandwidth = df[names == 'online gaming'].groupby('Application_Type', observed=True)['Required_Bandwidth'].mean().reset_index()
         fig = px.bar(avg_bandwidth, x='Application_Type', y='Required_Bandwidth', 
                       title="Average Bandwidth Requirement for Online Gaming",
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
     ### Histogram Query ###
-    elif "histogram" in query:
+    elif intent == "signal_strength_histogram":
+        if large:
+            return _histogram_figure(df['Signal_Strength'], "Histogram of Signal Strength Distribution")
         fig = go.Figure()
         fig.add_trace(go.Histogram(x=df['Signal_Strength'], marker_color=px.colors.sequential.Viridis[0])) 
         fig.update_layout(title="Histogram of Signal Strength Distribution")
         return fig
 
     ### Latency Analysis Queries ###
-    elif ("average latency" in query and "application" in query) or \
-         ("applications using the highest latency" in query):
-        avg_latency = df.groupby('Application_Type')['Latency'].mean().reset_index()
+    elif intent == "avg_latency_by_application":
+        avg_latency = _application_mean(df, 'Latency', cube).reset_index()
         fig = px.bar(avg_latency, x='Application_Type', y='Latency', 
                       title='Average Latency by Application Type',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "maximum average latency" in query:
-        max_latency_app = df.groupby('Application_Type')['Latency'].mean().idxmax()
+    elif intent == "max_avg_latency":
+        max_latency_app = _application_mean(df, 'Latency', cube).idxmax()
+        if large:
+            # One bar per row stacks to the group total, so the total alone draws the same bar
+            total = df.loc[df['Application_Type'] == max_latency_app, 'Latency'].sum()
+            fig = px.bar(x=[max_latency_app], y=[total], labels={'x': 'Application_Type', 'y': 'Latency'},
+                         title=f'Maximum Average Latency: {max_latency_app}',
+                         color_discrete_sequence=px.colors.sequential.Viridis)
+            return fig
         fig = px.bar(df[df['Application_Type'] == max_latency_app], x='Application_Type', y='Latency', 
                       title=f'Maximum Average Latency: {max_latency_app}',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "latency distribution by application type" in query or "visualize latency by application type" in query:
+    elif intent == "latency_by_application":
+        if large:
+            return _box_figure(df, 'Application_Type', 'Latency', 'Latency Distribution by Application Type')
         fig = px.box(df, x='Application_Type', y='Latency', 
                       title='Latency Distribution by Application Type',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "top applications with high latency" in query or "applications using the highest latency" in query:
-        top_apps = df.groupby('Application_Type')['Latency'].mean().nlargest(7).reset_index()
+    elif intent == "top_latency_applications":
+        top_apps = _application_mean(df, 'Latency', cube).nlargest(7).reset_index()
         fig = px.bar(top_apps, x='Application_Type', y='Latency', 
                       title='Top Applications with High Latency',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
     ### Resource Allocation Queries ###
-    elif "average resource allocation" in query and "application" in query:
-        avg_resource_alloc = df.groupby('Application_Type')['Resource_Allocation'].mean().reset_index()
+    elif intent == "avg_resource_allocation_by_application":
+        avg_resource_alloc = _application_mean(df, 'Resource_Allocation', cube).reset_index()
         fig = px.bar(avg_resource_alloc, x='Application_Type', y='Resource_Allocation', 
                       title='Average Resource Allocation by Application Type',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "distribution of resource allocation" in query:
+    elif intent == "resource_allocation_distribution":
+        if large:
+            return _histogram_figure(df['Resource_Allocation'], 'Distribution of Resource Allocation')
         fig = px.histogram(df, x='Resource_Allocation', title='Distribution of Resource Allocation',
                            color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
     ### Signal Strength Queries ###
-    elif "distribution of signal strength" in query:
+    elif intent == "signal_strength_distribution":
+        if large:
+            return _histogram_figure(df['Signal_Strength'], 'Distribution of Signal Strength', nbins=20)
         fig = px.histogram(df, x='Signal_Strength', nbins=20, title='Distribution of Signal Strength',
                            color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "visualize signal strength by application type" in query:
-        fig = px.scatter(df, x='Application_Type', y='Signal_Strength', title='Signal Strength by Application Type',
-                         color_discrete_sequence=px.colors.sequential.Viridis)
+    elif intent == "signal_strength_by_application":
+        fig = _scatter_figure(df, 'Application_Type', 'Signal_Strength', 'Signal Strength by Application Type',
+                              point_budget)
         return fig
 
     ### Application Types Queries ###
-    elif "distribution of application types" in query or "visualize distribution of application types" in query:
-        app_counts = df['Application_Type'].value_counts().reset_index()
+    elif intent == "application_type_distribution":
+        app_counts = _application_counts(df, cube).reset_index()
         app_counts.columns = ['Application_Type', 'Count']
         fig = px.bar(app_counts, x='Application_Type', y='Count', title='Distribution of Application Types',
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
-    elif "most commonly used application types" in query:
-        app_counts = df['Application_Type'].value_counts().reset_index()
+    elif intent == "most_common_applications":
+        app_counts = _application_counts(df, cube).reset_index()
         fig = px.bar(app_counts, x='Application_Type', y='Application_Type', 
                       title="Most Commonly Used Application Types",
                       color_discrete_sequence=px.colors.sequential.Viridis)
         return fig
 
     ### Bandwidth Relationships Queries ###
-    elif "relationship between allocated and required bandwidth" in query or \
-         "visualize the relationship between allocated bandwidth and required bandwidth" in query:
-        fig = px.scatter(df, x='Required_Bandwidth', y='Allocated_Bandwidth', 
-                         title="Relationship Between Allocated and Required Bandwidth",
-                         color_discrete_sequence=px.colors.sequential.Viridis)
+    elif intent == "bandwidth_relationship":
+        fig = _scatter_figure(df, 'Required_Bandwidth', 'Allocated_Bandwidth',
+                              "Relationship Between Allocated and Required Bandwidth", point_budget)
         return fig
 
     else: